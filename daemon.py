@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Headless Head Movement Music Control daemon
+
+Runs camera capture, face detection and media control without any Qt widgets.
+Frames are never converted to QImage/QPixmap or scaled for display; the only
+per-frame work is capture, inference and shortcut dispatch.
+
+Control surface:
+- A line based TCP server on 127.0.0.1 (default port 50505) accepting:
+  status, pause, resume, preview on, preview off, record on, record off, stop
+- Detection results can be streamed to other applications with --event-port
+  (see event_bus.py)
+- Head roll can drive the volume continuously with --roll-volume rate|target
+  (see volume_control.py)
+- Several cameras can be used at once with --cameras 0,1,2 (see multi_camera.py);
+  preview and recording are single-camera only
+- SIGINT/SIGTERM stop the daemon, SIGUSR1 toggles the preview (POSIX only)
+
+The preview is an optional OpenCV window that only exists while requested.
+
+Benchmark:
+    python daemon.py --benchmark [--video clip.mp4] [--frames 300] [--gui-sync]
+runs the GUI and the daemon frame loops in separate processes over the same
+source and compares CPU time per frame and peak memory.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+import cv2
+
+from event_bus import DEFAULT_EVENT_PORT, EventBus
+from multi_camera import MultiCameraSource
+from face_detector import FaceDetector
+from profiles import PROFILES, create_face_detector, resolve_profile
+from shortcuts import DEFAULT_SHORTCUT_MAP, run_shortcut
+from trace_cache import DEFAULT_TRACE_PATH, TraceWriter
+from volume_control import RollVolumeControl
+from utils import FPSCounter, get_memory_usage_mb
+
+DEFAULT_CONTROL_PORT = 50505
+PREVIEW_WINDOW = "Head Movement Music Control - Preview"
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            line = raw.decode('utf-8', errors='replace').strip()
+            if not line:
+                continue
+            reply = self.server.daemon.handle_command(line)
+            self.wfile.write((reply + "\n").encode('utf-8'))
+            if line == 'stop':
+                break
+
+class ControlServer(socketserver.ThreadingTCPServer):
+    """Localhost command server driving a HeadControlDaemon."""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, daemon, port=DEFAULT_CONTROL_PORT):
+        self.daemon = daemon
+        super().__init__(('127.0.0.1', port), _ControlHandler)
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name="control-server", daemon=True)
+        thread.start()
+        return thread
+
+class HeadControlDaemon:
+    """Capture, detect and dispatch loop without any GUI."""
+    def __init__(self, face_detector, music_controller=None, shortcut_map=None, target_fps=30, event_bus=None,
+                 capture_size=(640, 360), roll_volume=None):
+        """
+        Initialize the daemon.
+
+        Args:
+            face_detector: FaceDetector instance (None when a multi-camera source is used)
+            music_controller: MusicController instance (None disables media keys)
+            shortcut_map: Dictionary mapping movements to command names
+            target_fps: Upper bound for the capture/inference rate
+            event_bus: Optional EventBus receiving every detection result
+            capture_size: Requested camera resolution (width, height)
+            roll_volume: Optional RollVolumeControl fed with every pose
+        """
+        self.face_detector = face_detector
+        self.music_controller = music_controller
+        self.event_bus = event_bus
+        self.roll_volume = roll_volume
+        self.shortcut_map = dict(shortcut_map or DEFAULT_SHORTCUT_MAP)
+        self.frame_interval = 1.0 / target_fps if target_fps else 0.0
+        self.capture_size = capture_size
+        self.cap = None
+        self.multi_source = None
+        self.running = False
+        self.paused = False
+        self.preview = False
+        self._preview_open = False
+        self.recording = False
+        self.trace_path = DEFAULT_TRACE_PATH
+        self.fps_counter = FPSCounter()
+        self.last_movement = None
+        self.last_euler = None
+
+    def start_camera(self, camera_index=0):
+        self.cap = cv2.VideoCapture(camera_index)
+        if not self.cap.isOpened():
+            print("Could not open camera.")
+            return False
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.capture_size[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.capture_size[1])
+        return True
+
+    def process_frame(self):
+        """
+        Read, analyze and act on a single frame.
+
+        Returns:
+            bool: False if no frame could be read
+        """
+        if self.cap is None or not self.cap.isOpened():
+            return False
+        ret, frame = self.cap.read()
+        if not ret:
+            return False
+        self.fps_counter.update()
+        self._update_recording()
+        frame = cv2.flip(frame, 1)
+        # Noktalar sadece önizleme açıkken çizilir
+        frame, detection_result = self.face_detector.detect_face(frame, draw=self.preview)
+        self._handle_detection(detection_result)
+        self._update_preview(frame)
+        return True
+
+    def process_multi_camera(self):
+        """
+        Act on the next combined result of the multi-camera source.
+
+        Returns:
+            bool: False if no camera reported within the poll timeout
+        """
+        detection_result = self.multi_source.poll()
+        if detection_result is None:
+            return False
+        self.fps_counter.update()
+        self._handle_detection(detection_result)
+        return True
+
+    def _handle_detection(self, detection_result):
+        movement = detection_result.get('movement')
+        self.last_euler = detection_result.get('euler')
+        if self.event_bus:
+            self.event_bus.publish(detection_result)
+        if self.roll_volume:
+            self.roll_volume.update(self.last_euler, detection_result.get('timestamp'))
+        if movement:
+            self.last_movement = movement
+            cmd = run_shortcut(self.music_controller, movement, self.shortcut_map)
+            if cmd:
+                print(f"{movement} -> {cmd}")
+
+    def _update_recording(self):
+        # Kayıt dosyası yalnızca döngü iş parçacığında açılıp kapatılır
+        if self.face_detector is None:
+            # Çoklu kamera modunda kayıt yok
+            self.recording = False
+            return
+        recorder = self.face_detector.recorder
+        if self.recording and recorder is None:
+            try:
+                self.face_detector.recorder = TraceWriter(self.trace_path, self.face_detector.num_landmarks)
+            except (OSError, ValueError) as e:
+                print(f"Failed to start recording: {str(e)}")
+                self.recording = False
+        elif not self.recording and recorder is not None:
+            recorder.close()
+            self.face_detector.recorder = None
+
+    def _update_preview(self, frame):
+        # HighGUI çağrıları yalnızca döngü iş parçacığından yapılır
+        if self.preview:
+            cv2.imshow(PREVIEW_WINDOW, frame)
+            cv2.waitKey(1)
+            self._preview_open = True
+        elif self._preview_open:
+            cv2.destroyWindow(PREVIEW_WINDOW)
+            cv2.waitKey(1)
+            self._preview_open = False
+
+    def run(self):
+        """Run the frame loop until stop() is called."""
+        self.running = True
+        next_time = time.perf_counter()
+        while self.running:
+            if self.paused:
+                if not self.preview:
+                    self._update_preview(None)
+                time.sleep(0.1)
+                next_time = time.perf_counter()
+                continue
+            if self.multi_source is not None:
+                # Kameralar kendi hızlarında çalışır; sonuçlar geldikçe işlenir
+                self.process_multi_camera()
+                continue
+            if not self.process_frame():
+                time.sleep(0.1)
+            next_time += self.frame_interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_time = time.perf_counter()
+
+    def stop(self):
+        self.running = False
+
+    def handle_command(self, line):
+        """
+        Execute a control command.
+
+        Args:
+            line: Command string
+
+        Returns:
+            str: Reply sent back to the client
+        """
+        parts = line.split()
+        cmd = parts[0].lower() if parts else ''
+        if cmd == 'status':
+            return (f"ok fps={self.fps_counter.get_fps():.1f} paused={self.paused} "
+                    f"preview={self.preview} recording={self.recording} last_movement={self.last_movement}")
+        if cmd == 'pause':
+            self.paused = True
+            return "ok paused"
+        if cmd == 'resume':
+            self.paused = False
+            return "ok resumed"
+        if cmd == 'preview':
+            arg = parts[1].lower() if len(parts) > 1 else 'toggle'
+            if arg == 'on':
+                self.preview = True
+            elif arg == 'off':
+                self.preview = False
+            else:
+                self.preview = not self.preview
+            return f"ok preview={self.preview}"
+        if cmd == 'record':
+            arg = parts[1].lower() if len(parts) > 1 else 'toggle'
+            if arg == 'on':
+                self.recording = True
+            elif arg == 'off':
+                self.recording = False
+            else:
+                self.recording = not self.recording
+            return f"ok recording={self.recording}"
+        if cmd == 'stop':
+            self.stop()
+            return "ok stopping"
+        return f"error unknown command: {line}"
+
+    def cleanup(self):
+        if self.cap and self.cap.isOpened():
+            self.cap.release()
+        if self.multi_source is not None:
+            self.multi_source.stop()
+        self.recording = False
+        self._update_recording()
+        if self._preview_open:
+            cv2.destroyWindow(PREVIEW_WINDOW)
+        if self.music_controller:
+            self.music_controller.cleanup()
+        if self.event_bus:
+            self.event_bus.close()
+        if self.roll_volume:
+            self.roll_volume.stop()
+
+def _install_signal_handlers(daemon):
+    def _stop(signum, frame):
+        daemon.stop()
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+    if hasattr(signal, 'SIGUSR1'):
+        def _toggle_preview(signum, frame):
+            daemon.preview = not daemon.preview
+        signal.signal(signal.SIGUSR1, _toggle_preview)
+
+def _open_source(video=None, camera_index=0):
+    """Open the benchmark source: a video file or a camera index."""
+    cap = cv2.VideoCapture(video if video else camera_index)
+    if not video:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 360)
+    return cap
+
+def _benchmark_worker(mode, frames, video, camera_index, gui_sync=False):
+    """Run one frame loop unthrottled and print its resource usage as JSON."""
+    cap = _open_source(video, camera_index)
+    face_detector = FaceDetector()
+    if mode == 'gui':
+        from PyQt5.QtWidgets import QApplication
+        from gui import HeadControlApp
+        app = QApplication(sys.argv[:1])
+        window = HeadControlApp()
+        window.set_controllers(face_detector, None)
+        window.cap = cap
+        # Varsayılan: uygulamadaki gibi çıkarım iş parçacığı ve kuyruklu sinyaller
+        if not gui_sync:
+            window.start_inference_worker()
+        window.show()
+        step = window.step_frame
+    else:
+        daemon = HeadControlDaemon(face_detector)
+        daemon.cap = cap
+        step = daemon.process_frame
+
+    # İlk karede model yüklemesi ölçüme katılmaz
+    step()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(frames):
+        step()
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    rss, peak = get_memory_usage_mb()
+    if mode == 'gui':
+        window.close()
+    print(json.dumps({
+        'mode': mode,
+        'frames': frames,
+        'cpu_ms_per_frame': 1000.0 * cpu / frames,
+        'wall_ms_per_frame': 1000.0 * wall / frames,
+        'rss_mb': rss,
+        'peak_rss_mb': peak,
+    }))
+    return 0
+
+def run_benchmark(frames=300, video=None, camera_index=0, gui_sync=False):
+    """
+    Compare the GUI and daemon frame loops in separate processes.
+
+    The GUI runs detection in its inference worker thread like the app, or in
+    the GUI thread with gui_sync.
+
+    Returns:
+        Dictionary mapping mode name to its measured results
+    """
+    results = {}
+    for mode in ('gui', 'daemon'):
+        cmd = [sys.executable, os.path.abspath(__file__), '--benchmark-mode', mode,
+               '--frames', str(frames), '--camera', str(camera_index)]
+        if video:
+            cmd += ['--video', video]
+        if gui_sync:
+            cmd += ['--gui-sync']
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        results[mode] = json.loads(out.strip().splitlines()[-1])
+
+    gui, daemon = results['gui'], results['daemon']
+    print(f"{'':<22}{'GUI':>12}{'Daemon':>12}")
+    for key in ('cpu_ms_per_frame', 'wall_ms_per_frame', 'rss_mb', 'peak_rss_mb'):
+        g, d = gui.get(key), daemon.get(key)
+        if g is None or d is None:
+            continue
+        print(f"{key:<22}{g:>12.2f}{d:>12.2f}")
+    if gui['cpu_ms_per_frame'] > 0:
+        saving = 100.0 * (1 - daemon['cpu_ms_per_frame'] / gui['cpu_ms_per_frame'])
+        print(f"CPU saving per frame: {saving:.1f}%")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless head movement music control")
+    parser.add_argument('--camera', type=int, default=0, help="Camera index")
+    parser.add_argument('--cameras', help="Comma separated camera indices for multi-camera mode, e.g. 0,1,2")
+    parser.add_argument('--camera-mode', choices=['select', 'fuse'], default='select',
+                        help="Multi-camera mode: best-view selection or pose fusion")
+    parser.add_argument('--port', type=int, default=DEFAULT_CONTROL_PORT, help="Control port on 127.0.0.1 (0 disables)")
+    parser.add_argument('--event-port', type=int, default=None, nargs='?', const=DEFAULT_EVENT_PORT,
+                        help=f"Publish detection events on 127.0.0.1 (default port {DEFAULT_EVENT_PORT})")
+    parser.add_argument('--fps', type=float, default=None, help="Maximum frame rate (default: from profile)")
+    parser.add_argument('--profile', default='auto', choices=['auto'] + list(PROFILES),
+                        help="Performance profile (default: auto, benchmarked once and cached)")
+    parser.add_argument('--rebenchmark', action='store_true', help="Measure the auto profile again")
+    parser.add_argument('--track-interval', type=int, default=None,
+                        help="Run FaceMesh every N frames and track pose points with optical flow in between")
+    parser.add_argument('--roll-volume', choices=['rate', 'target'], default=None,
+                        help="Control the volume continuously with head roll")
+    parser.add_argument('--preview', action='store_true', help="Start with the preview window open")
+    parser.add_argument('--record', nargs='?', const=DEFAULT_TRACE_PATH, default=None,
+                        help=f"Record landmark traces (default file: {DEFAULT_TRACE_PATH})")
+    parser.add_argument('--benchmark', action='store_true', help="Compare CPU and memory against the GUI mode")
+    parser.add_argument('--benchmark-mode', choices=['gui', 'daemon'], help=argparse.SUPPRESS)
+    parser.add_argument('--frames', type=int, default=300, help="Frames to measure in benchmark mode")
+    parser.add_argument('--gui-sync', action='store_true',
+                        help="Benchmark the GUI with detection in the GUI thread instead of the inference worker")
+    parser.add_argument('--video', help="Video file to use as benchmark source instead of the camera")
+    args = parser.parse_args()
+
+    if args.benchmark_mode:
+        return _benchmark_worker(args.benchmark_mode, args.frames, args.video, args.camera, args.gui_sync)
+    if args.benchmark:
+        run_benchmark(args.frames, args.video, args.camera, args.gui_sync)
+        return 0
+
+    try:
+        if args.cameras:
+            # Algılama kamera süreçlerinde yapılır; ana süreçte FaceMesh ve ölçüm gereksiz
+            profile_name = resolve_profile(args.profile, benchmark=False)
+            face_detector = None
+        else:
+            profile_name = resolve_profile(args.profile, args.rebenchmark, args.camera)
+            face_detector = create_face_detector(profile_name, track_interval=args.track_interval)
+            print(f"Face detector initialized successfully (profile: {profile_name}).")
+        profile = PROFILES[profile_name]
+    except Exception as e:
+        print(f"Failed to initialize face detector: {str(e)}")
+        return 1
+    try:
+        from music_controller import MusicController
+        music_controller = MusicController()
+        print("Music controller initialized successfully.")
+    except Exception as e:
+        print(f"Failed to initialize music controller: {str(e)}")
+        return 1
+
+    event_bus = None
+    if args.event_port is not None:
+        event_bus = EventBus(port=args.event_port).start()
+        print(f"Event bus listening on 127.0.0.1:{event_bus.address[1]}")
+
+    daemon = HeadControlDaemon(face_detector, music_controller, target_fps=args.fps or profile['target_fps'],
+                               event_bus=event_bus, capture_size=profile['capture_size'])
+    if args.roll_volume:
+        daemon.roll_volume = RollVolumeControl(music_controller, mode=args.roll_volume).start()
+    daemon.preview = args.preview
+    if args.record:
+        daemon.trace_path = args.record
+        daemon.recording = True
+    if args.cameras:
+        cameras = [int(c) for c in args.cameras.split(',') if c.strip()]
+        daemon.multi_source = MultiCameraSource(cameras, profile_name, profile['capture_size'],
+                                                args.track_interval, args.camera_mode).start()
+        daemon.preview = False
+        daemon.recording = False
+        print(f"Multi-camera mode ({args.camera_mode}, profile: {profile_name}) with cameras {cameras}")
+    elif not daemon.start_camera(args.camera):
+        return 1
+    _install_signal_handlers(daemon)
+
+    server = None
+    if args.port:
+        server = ControlServer(daemon, args.port)
+        server.start()
+        print(f"Control server listening on 127.0.0.1:{args.port}")
+    try:
+        daemon.run()
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+        daemon.cleanup()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Parallel evaluation of FaceDetector over a labeled clip corpus.
+
+Corpus layout: every video clip (mp4, avi, mov, mkv) has a sidecar JSON file
+with the same stem listing the labeled head movements:
+
+    clip_001.mp4
+    clip_001.json   {"events": [{"movement": "left", "start": 1.20, "end": 2.05}, ...]}
+
+Clips are sharded across a process pool; each worker creates its FaceDetector
+(and therefore its FaceMesh graph) once and reuses it for every clip it gets.
+A triggered movement counts as a true positive when it falls inside an unmatched
+labeled event of the same class (extended by --tolerance seconds), otherwise as
+a false positive; labeled events that are never matched are false negatives.
+
+Per-clip results are appended to a JSONL file as soon as a clip finishes, so an
+interrupted run continues where it stopped when started again with the same
+--results file.
+
+With --traces DIR the per-frame Euler angles of every clip are also saved as
+.npz traces (with the labels embedded) for sweep.py.
+
+Usage:
+    python evaluate.py CORPUS_DIR [--results eval_results.jsonl] [--workers N] [--traces DIR]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+MOVEMENTS = ['right', 'left', 'up', 'down']
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv'}
+
+_detector = None
+
+def find_clips(corpus_dir):
+    """
+    List the labeled clips of a corpus.
+
+    Args:
+        corpus_dir: Directory containing clips and their label files
+
+    Returns:
+        Sorted list of (video_path, label_path) string tuples
+    """
+    clips = []
+    for path in sorted(Path(corpus_dir).rglob('*')):
+        if path.suffix.lower() in VIDEO_EXTENSIONS:
+            label_path = path.with_suffix('.json')
+            if label_path.exists():
+                clips.append((str(path), str(label_path)))
+    return clips
+
+def match_events(detections, labels, tolerance=0.5):
+    """
+    Match triggered movements against labeled events.
+
+    Args:
+        detections: List of (timestamp, movement) tuples
+        labels: List of {'movement', 'start', 'end'} dictionaries
+        tolerance: Seconds a trigger may lag behind the end of an event
+
+    Returns:
+        Dictionary mapping movement to {'tp', 'fp', 'fn'} counts
+    """
+    counts = {m: {'tp': 0, 'fp': 0, 'fn': 0} for m in MOVEMENTS}
+    matched = [False] * len(labels)
+    for timestamp, movement in detections:
+        for i, event in enumerate(labels):
+            if (not matched[i] and event['movement'] == movement
+                    and event['start'] <= timestamp <= event['end'] + tolerance):
+                matched[i] = True
+                counts[movement]['tp'] += 1
+                break
+        else:
+            counts.setdefault(movement, {'tp': 0, 'fp': 0, 'fn': 0})['fp'] += 1
+    for event, was_matched in zip(labels, matched):
+        if not was_matched:
+            counts.setdefault(event['movement'], {'tp': 0, 'fp': 0, 'fn': 0})['fn'] += 1
+    return counts
+
+def _init_worker():
+    global _detector
+    import cv2
+    # Her işçi tek çekirdek kullanır; paralellik süreç havuzundan gelir
+    cv2.setNumThreads(1)
+    from face_detector import FaceDetector
+    _detector = FaceDetector()
+
+def evaluate_clip(clip, tolerance=0.5, traces_dir=None):
+    """
+    Run the worker's FaceDetector over one clip.
+
+    Args:
+        clip: (video_path, label_path) tuple
+        tolerance: See match_events()
+        traces_dir: Save the clip's pose trace to this directory if given
+
+    Returns:
+        Dictionary with per-class counts and timing for the clip
+    """
+    import cv2
+    import numpy as np
+    video_path, label_path = clip
+    with open(label_path, encoding='utf-8') as f:
+        labels = json.load(f).get('events', [])
+
+    _detector.reset()
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    detections = []
+    eulers = []
+    frames = 0
+    start = time.perf_counter()
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        # Canlı uygulamadaki gibi ayna görüntüsü
+        frame = cv2.flip(frame, 1)
+        timestamp = frames / fps
+        _, result = _detector.detect_face(frame, draw=False, timestamp=timestamp)
+        if result['movement']:
+            detections.append((timestamp, result['movement']))
+        eulers.append(result['euler'] if result['euler'] is not None else (np.nan, np.nan, np.nan))
+        frames += 1
+    cap.release()
+    elapsed = time.perf_counter() - start
+
+    if traces_dir:
+        np.savez(os.path.join(traces_dir, Path(video_path).stem + '.npz'),
+                 timestamp=np.arange(frames) / fps,
+                 euler=np.asarray(eulers, dtype=np.float32).reshape(-1, 3),
+                 events=json.dumps(labels))
+
+    return {
+        'clip': video_path,
+        'frames': frames,
+        'seconds': elapsed,
+        'worker': os.getpid(),
+        'detections': detections,
+        'counts': match_events(detections, labels, tolerance),
+    }
+
+def _evaluate_clip_star(args):
+    return evaluate_clip(*args)
+
+def load_results(results_path):
+    """Load per-clip results of a previous (possibly interrupted) run."""
+    results = {}
+    if os.path.exists(results_path):
+        with open(results_path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # yarıda kalmış son satır
+                results[result['clip']] = result
+    return results
+
+def summarize(results):
+    """
+    Aggregate per-clip results into per-class precision/recall and throughput.
+
+    Returns:
+        Summary dictionary
+    """
+    totals = {}
+    frames = 0
+    busy = 0.0
+    for result in results:
+        frames += result['frames']
+        busy += result['seconds']
+        for movement, c in result['counts'].items():
+            t = totals.setdefault(movement, {'tp': 0, 'fp': 0, 'fn': 0})
+            for key in t:
+                t[key] += c[key]
+    classes = {}
+    for movement, t in totals.items():
+        precision = t['tp'] / (t['tp'] + t['fp']) if t['tp'] + t['fp'] else None
+        recall = t['tp'] / (t['tp'] + t['fn']) if t['tp'] + t['fn'] else None
+        classes[movement] = dict(t, precision=precision, recall=recall)
+    summary = {
+        'clips': len(results),
+        'frames': frames,
+        'classes': classes,
+        'frames_per_worker_second': frames / busy if busy else None,
+    }
+    return summary
+
+def print_summary(summary):
+    print(f"Clips: {summary['clips']}  Frames: {summary['frames']}")
+    print(f"{'class':<8}{'tp':>6}{'fp':>6}{'fn':>6}{'precision':>11}{'recall':>9}")
+    fmt = lambda v: f"{v:.3f}" if v is not None else "-"
+    for movement in sorted(summary['classes']):
+        c = summary['classes'][movement]
+        print(f"{movement:<8}{c['tp']:>6}{c['fp']:>6}{c['fn']:>6}{fmt(c['precision']):>11}{fmt(c['recall']):>9}")
+    if summary['frames_per_worker_second']:
+        print(f"Throughput per worker: {summary['frames_per_worker_second']:.1f} frames/s")
+    if summary.get('frames_per_second'):
+        print(f"Total throughput: {summary['frames_per_second']:.1f} frames/s")
+
+def run_evaluation(corpus_dir, results_path, workers=None, tolerance=0.5, traces_dir=None):
+    """
+    Evaluate all clips of a corpus, skipping the ones already in results_path.
+
+    Returns:
+        Summary dictionary over all clips (previous and new)
+    """
+    clips = find_clips(corpus_dir)
+    done = load_results(results_path)
+    todo = [clip for clip in clips if clip[0] not in done]
+    print(f"{len(clips)} clips, {len(done)} already evaluated, {len(todo)} to go")
+
+    workers = workers or os.cpu_count() or 1
+    if traces_dir:
+        os.makedirs(traces_dir, exist_ok=True)
+    new_results = []
+    start = time.perf_counter()
+    if todo:
+        with multiprocessing.Pool(processes=min(workers, len(todo)), initializer=_init_worker) as pool, \
+                open(results_path, 'a', encoding='utf-8') as out:
+            if out.tell() > 0:
+                out.write('\n')  # kesintiyle yarım kalmış satırı kapat
+            tasks = [(clip, tolerance, traces_dir) for clip in todo]
+            for i, result in enumerate(pool.imap_unordered(_evaluate_clip_star, tasks), 1):
+                out.write(json.dumps(result) + '\n')
+                out.flush()
+                new_results.append(result)
+                print(f"[{i}/{len(todo)}] {result['clip']} ({result['frames']} frames, {result['seconds']:.1f}s)")
+    wall_time = time.perf_counter() - start
+
+    summary = summarize(list(done.values()) + new_results)
+    if new_results:
+        summary['frames_per_second'] = sum(r['frames'] for r in new_results) / wall_time
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate FaceDetector over a labeled clip corpus")
+    parser.add_argument('corpus', help="Directory with clips and their JSON label files")
+    parser.add_argument('--results', default='eval_results.jsonl', help="Per-clip results file (used for resuming)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Seconds a trigger may lag behind a labeled event")
+    parser.add_argument('--traces', help="Also save per-clip pose traces (.npz) to this directory")
+    args = parser.parse_args()
+
+    summary = run_evaluation(args.corpus, args.results, args.workers, args.tolerance, args.traces)
+    print_summary(summary)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Local publish/subscribe bus for head-gesture detection results.
+
+The frame loop calls EventBus.publish() with the dictionary returned by
+FaceDetector.detect_face(). Publishing only appends to a bounded deque and
+wakes the I/O thread, which encodes each event once per wire format and fans
+it out to every subscriber over non-blocking sockets.
+
+Wire formats (a client selects one by sending "json" or "binary" + newline;
+nothing is sent to a client before that line, and the first valid line fixes
+the format for the connection):
+- json:   one JSON object per line:
+          {"seq": 12, "timestamp": 1700000000.12, "movement": "left", "euler": [p, y, r]}
+- binary: fixed 26 byte little-endian records, see BINARY_FORMAT
+
+Each client has its own bounded queue; when a client cannot keep up the
+oldest queued events are dropped so that it always receives recent data.
+
+Usage:
+    python event_bus.py [--host 127.0.0.1] [--port 50506] [--binary]
+prints the events of a running publisher.
+"""
+
+import argparse
+import json
+import math
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+DEFAULT_EVENT_PORT = 50506
+
+# seq, timestamp, movement code, flags, pitch, yaw, roll
+BINARY_FORMAT = '<IdBB3f'
+BINARY_SIZE = struct.calcsize(BINARY_FORMAT)
+MOVEMENT_CODES = {None: 0, 'right': 1, 'left': 2, 'up': 3, 'down': 4}
+MOVEMENT_NAMES = {code: name for name, code in MOVEMENT_CODES.items()}
+FLAG_HAS_EULER = 0x01
+
+def encode_json(seq, timestamp, movement, euler):
+    """Encode an event as a newline terminated JSON line."""
+    event = {
+        'seq': seq,
+        'timestamp': timestamp,
+        'movement': movement,
+        'euler': None if euler is None else [float(a) for a in euler],
+    }
+    return (json.dumps(event, separators=(',', ':')) + '\n').encode('utf-8')
+
+def encode_binary(seq, timestamp, movement, euler):
+    """Encode an event as a fixed size binary record."""
+    if euler is None:
+        return struct.pack(BINARY_FORMAT, seq & 0xFFFFFFFF, timestamp, MOVEMENT_CODES.get(movement, 0), 0,
+                           math.nan, math.nan, math.nan)
+    return struct.pack(BINARY_FORMAT, seq & 0xFFFFFFFF, timestamp, MOVEMENT_CODES.get(movement, 0),
+                       FLAG_HAS_EULER, float(euler[0]), float(euler[1]), float(euler[2]))
+
+def decode_binary(record):
+    """
+    Decode a binary record produced by encode_binary().
+
+    Returns:
+        Dictionary with seq, timestamp, movement and euler keys
+    """
+    seq, timestamp, code, flags, pitch, yaw, roll = struct.unpack(BINARY_FORMAT, record)
+    return {
+        'seq': seq,
+        'timestamp': timestamp,
+        'movement': MOVEMENT_NAMES.get(code),
+        'euler': [pitch, yaw, roll] if flags & FLAG_HAS_EULER else None,
+    }
+
+ENCODERS = {'json': encode_json, 'binary': encode_binary}
+
+class _Client:
+    def __init__(self, sock, queue_size):
+        self.sock = sock
+        # Biçim satırı gelene kadar hiçbir şey gönderilmez
+        self.encoding = None
+        self.queue = deque(maxlen=queue_size)
+        self.out = b''
+        self.inbuf = b''
+        self.dropped = 0
+
+class EventBus:
+    """Non-blocking fan-out of detection results to local subscribers."""
+    def __init__(self, host='127.0.0.1', port=DEFAULT_EVENT_PORT, unix_path=None, queue_size=64):
+        """
+        Initialize the event bus.
+
+        Args:
+            host: Interface to listen on (keep it local)
+            port: TCP port, 0 picks a free one
+            unix_path: Listen on this Unix domain socket instead of TCP
+            queue_size: Maximum events queued per client before the oldest are dropped
+        """
+        if unix_path:
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._server.bind(unix_path)
+        else:
+            self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._server.bind((host, port))
+        self._server.listen()
+        self._server.setblocking(False)
+        self.address = self._server.getsockname()
+        self.queue_size = queue_size
+        self._pending = deque(maxlen=queue_size)
+        self._clients = {}
+        self._seq = 0
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._running = False
+        self._thread = None
+
+    @property
+    def subscriber_count(self):
+        return len(self._clients)
+
+    def start(self):
+        self._selector.register(self._server, selectors.EVENT_READ, 'accept')
+        self._selector.register(self._wake_r, selectors.EVENT_READ, 'wake')
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name="event-bus", daemon=True)
+        self._thread.start()
+        return self
+
+    def publish(self, detection_result, timestamp=None):
+        """
+        Queue a detection result for all subscribers. Never blocks.
+
+        Args:
+            detection_result: Dictionary with 'movement' and 'euler' keys
+            timestamp: Event time, defaults to detection_result['timestamp'] or now
+        """
+        if not self._clients:
+            return
+        if timestamp is None:
+            timestamp = detection_result.get('timestamp')
+            if timestamp is None:
+                timestamp = time.time()
+        self._seq += 1
+        self._pending.append((self._seq, timestamp, detection_result.get('movement'), detection_result.get('euler')))
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass  # uyandırma zaten bekliyor
+
+    def close(self):
+        self._running = False
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        for client in list(self._clients.values()):
+            client.sock.close()
+        self._clients = {}
+        self._selector.close()
+        self._server.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def _serve(self):
+        while self._running:
+            for key, mask in self._selector.select(timeout=0.5):
+                if key.data == 'accept':
+                    self._accept()
+                elif key.data == 'wake':
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    self._fan_out()
+                else:
+                    client = key.data
+                    if mask & selectors.EVENT_READ:
+                        self._read(client)
+                    if mask & selectors.EVENT_WRITE and client.sock.fileno() in self._clients:
+                        self._flush(client)
+
+    def _accept(self):
+        try:
+            sock, _ = self._server.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        if sock.family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = _Client(sock, self.queue_size)
+        clients = dict(self._clients)
+        clients[sock.fileno()] = client
+        self._clients = clients
+        self._selector.register(sock, selectors.EVENT_READ, client)
+
+    def _drop(self, client):
+        clients = dict(self._clients)
+        clients.pop(client.sock.fileno(), None)
+        self._clients = clients
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+    def _read(self, client):
+        try:
+            data = client.sock.recv(1024)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._drop(client)
+            return
+        client.inbuf += data
+        while b'\n' in client.inbuf:
+            line, client.inbuf = client.inbuf.split(b'\n', 1)
+            encoding = line.strip().decode('ascii', errors='ignore').lower()
+            if client.encoding is None and encoding in ENCODERS:
+                client.encoding = encoding
+        client.inbuf = client.inbuf[-64:]
+
+    def _fan_out(self):
+        while self._pending:
+            event = self._pending.popleft()
+            encoded = {}
+            for client in self._clients.values():
+                if client.encoding is None:
+                    continue
+                payload = encoded.get(client.encoding)
+                if payload is None:
+                    payload = encoded[client.encoding] = ENCODERS[client.encoding](*event)
+                if len(client.queue) == client.queue.maxlen:
+                    client.dropped += 1
+                client.queue.append(payload)
+        for client in list(self._clients.values()):
+            self._flush(client)
+
+    def _flush(self, client):
+        while True:
+            if not client.out:
+                if not client.queue:
+                    break
+                client.out = client.queue.popleft()
+            try:
+                sent = client.sock.send(client.out)
+            except BlockingIOError:
+                sent = 0
+            except OSError:
+                self._drop(client)
+                return
+            client.out = client.out[sent:]
+            if client.out:
+                break
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.out or client.queue else 0)
+        self._selector.modify(client.sock, events, client)
+
+def subscribe(host='127.0.0.1', port=DEFAULT_EVENT_PORT, binary=False):
+    """
+    Connect to an event bus and yield decoded events.
+
+    Args:
+        host: Publisher host
+        port: Publisher port
+        binary: Use the compact binary encoding
+
+    Yields:
+        Event dictionaries
+    """
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall(b'binary\n' if binary else b'json\n')
+        buf = b''
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                return
+            buf += data
+            if binary:
+                while len(buf) >= BINARY_SIZE:
+                    yield decode_binary(buf[:BINARY_SIZE])
+                    buf = buf[BINARY_SIZE:]
+            else:
+                while b'\n' in buf:
+                    line, buf = buf.split(b'\n', 1)
+                    yield json.loads(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print head-gesture events from a running publisher")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_EVENT_PORT)
+    parser.add_argument('--binary', action='store_true', help="Use the compact binary encoding")
+    args = parser.parse_args()
+    try:
+        for event in subscribe(args.host, args.port, args.binary):
+            print(event)
+    except KeyboardInterrupt:
+        pass
@@ -5,9 +5,39 @@ from scipy.spatial.transform import Rotation
 import time
 
 class FaceDetector:
-    def __init__(self):
+    # 3D model points (mm cinsinden, referans kafa modeli)
+    MODEL_POINTS = np.array([
+        [0.0, 0.0, 0.0],             # Burun ucu
+        [0.0, -330.0, -65.0],        # Çene
+        [-225.0, 170.0, -135.0],     # Sol göz köşesi
+        [225.0, 170.0, -135.0],      # Sağ göz köşesi
+        [-150.0, -150.0, -125.0],    # Sol ağız köşesi
+        [150.0, -150.0, -125.0]      # Sağ ağız köşesi
+    ], dtype=np.float64)
+    # MediaPipe landmark indexleri (MODEL_POINTS ile aynı sırada)
+    POSE_LANDMARKS = [1, 152, 263, 33, 287, 57]
+
+    def __init__(self, inference=True, track_interval=1, max_flow_error=2.0, refine_landmarks=True,
+                 min_detection_confidence=0.7, min_tracking_confidence=0.7, inference_width=None):
         self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(static_image_mode=False, max_num_faces=1, refine_landmarks=True, min_detection_confidence=0.7, min_tracking_confidence=0.7)
+        # inference=False: sadece kayıtlı izlerin tekrarı için, FaceMesh oluşturulmaz
+        self.face_mesh = self.mp_face_mesh.FaceMesh(static_image_mode=False, max_num_faces=1, refine_landmarks=refine_landmarks, min_detection_confidence=min_detection_confidence, min_tracking_confidence=min_tracking_confidence) if inference else None
+        # refine_landmarks=True: 468 yüz + 10 iris noktası (iris modeli kafa pozu için gerekmez)
+        self.num_landmarks = 478 if refine_landmarks else 468
+        # FaceMesh'e verilmeden önce kare bu genişliğe küçültülür (None: tam çözünürlük)
+        self.inference_width = inference_width
+        # Her karede yeniden kullanılan (N, 3) landmark dizisi
+        self._landmarks = np.empty((self.num_landmarks, 3), dtype=np.float32)
+        self._landmarks_flat = self._landmarks.reshape(-1)
+        self.recorder = None  # trace_cache.TraceWriter, kayıt açıkken
+        # Hibrit takip: her track_interval karede bir FaceMesh, arada 6 poz noktası için Lucas-Kanade
+        self.track_interval = max(1, int(track_interval))
+        self.max_flow_error = max_flow_error  # piksel, ileri-geri hata sınırı
+        self.lk_params = dict(winSize=(21, 21), maxLevel=3,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+        self._prev_gray = None
+        self._tracked_points = None
+        self._frames_since_inference = 0
         self.mp_draw = mp.solutions.drawing_utils
         self.last_euler = None
         self.last_movement = None
@@ -17,24 +47,81 @@ class FaceDetector:
         self.stable_start_time = 0
         self.stable_required = 0.5  # hareketin en az bu kadar saniye devam etmesi gerekir
 
-    def detect_face(self, frame):
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb)
+    def detect_face(self, frame, draw=True, timestamp=None):
+        h, w, _ = frame.shape
         movement = None
         euler = None
-        if results.multi_face_landmarks:
-            for face_landmarks in results.multi_face_landmarks:
+        landmarks = None
+        pose_points = None
+        tracked = False
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if self.track_interval > 1 else None
+        if (gray is not None and self._tracked_points is not None
+                and self._frames_since_inference < self.track_interval):
+            pose_points = self._track_pose_points(gray)
+            tracked = pose_points is not None
+        if not tracked:
+            small = frame
+            if self.inference_width and w > self.inference_width:
+                # Landmarklar normalize olduğundan küçültme koordinatları etkilemez
+                small = cv2.resize(frame, (self.inference_width, int(h * self.inference_width / w)), interpolation=cv2.INTER_AREA)
+            rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            results = self.face_mesh.process(rgb)
+            self._frames_since_inference = 0
+            if results.multi_face_landmarks:
+                landmarks = self._landmarks_to_array(results.multi_face_landmarks[0])
+                pose_points = landmarks[self.POSE_LANDMARKS, :2] * np.array([w, h], dtype=np.float64)
+            self._tracked_points = pose_points.astype(np.float32).reshape(-1, 1, 2) if pose_points is not None and gray is not None else None
+        self._frames_since_inference += 1
+        self._prev_gray = gray
+        if pose_points is not None:
+            euler = self._solve_head_pose(pose_points, frame.shape)
+            movement = self._analyze_head_movement(euler)
+            if draw:
                 # Sadece kafa pozu için kullanılan 6 noktayı çiz
-                h, w, _ = frame.shape
-                image_points_idx = [1, 152, 263, 33, 287, 57]
-                lm = face_landmarks.landmark
-                for idx in image_points_idx:
-                    x, y = int(lm[idx].x * w), int(lm[idx].y * h)
-                    cv2.circle(frame, (x, y), 5, (0, 255, 0), -1)
-                euler = self._get_head_pose(face_landmarks, frame.shape)
-                movement = self._analyze_head_movement(euler)
+                for x, y in pose_points.astype(np.int32):
+                    cv2.circle(frame, (int(x), int(y)), 5, (0, 255, 0), -1)
+        # Kayıtlı videolarda kare zamanı kullanılır
+        now = time.time() if timestamp is None else timestamp
+        if self.recorder is not None:
+            self.recorder.append(now, landmarks, euler, frame.shape)
+        send_movement = self._debounce(movement, now)
+        # 'landmarks' bir sonraki karede üzerine yazılır; saklamak için kopyalayın
+        return frame, {'movement': send_movement, 'euler': euler, 'timestamp': now,
+                       'landmarks': landmarks, 'pose_points': pose_points, 'tracked': tracked}
+
+    def _track_pose_points(self, gray):
+        """
+        Track the six pose points from the previous frame with pyramidal Lucas-Kanade.
+
+        Returns:
+            (6, 2) float64 pixel coordinates, or None if tracking is lost or the
+            forward-backward error exceeds max_flow_error (forces re-detection)
+        """
+        p0 = self._tracked_points
+        p1, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, p0, None, **self.lk_params)
+        if p1 is None or not status.all():
+            return None
+        p0r, status_back, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev_gray, p1, None, **self.lk_params)
+        if p0r is None or not status_back.all():
+            return None
+        fb_error = np.linalg.norm((p0 - p0r).reshape(-1, 2), axis=1)
+        if fb_error.max() > self.max_flow_error:
+            return None
+        self._tracked_points = p1
+        return p1.reshape(-1, 2).astype(np.float64)
+
+    def _landmarks_to_array(self, face_landmarks):
+        """
+        Copy a MediaPipe landmark list into the reusable (N, 3) float32 array.
+
+        This is the only protobuf traversal per frame; pose estimation, drawing
+        and the GUI work on views or fancy-indexed subsets of the result.
+        """
+        self._landmarks_flat[:] = [v for p in face_landmarks.landmark for v in (p.x, p.y, p.z)]
+        return self._landmarks
+
+    def _debounce(self, movement, now):
         # Debounce ve hareket değişimi kontrolü
-        now = time.time()
         send_movement = None
         if movement and (movement != self.last_movement or (now - self.last_movement_time) > self.min_interval):
             send_movement = movement
@@ -42,25 +129,23 @@ class FaceDetector:
             self.last_movement_time = now
         elif not movement:
             self.last_movement = None
-        return frame, {'movement': send_movement, 'euler': euler}
+        return send_movement
 
-    def _get_head_pose(self, landmarks, image_shape):
-        # 3D model points (mm cinsinden, referans kafa modeli)
-        model_points = np.array([
-            [0.0, 0.0, 0.0],             # Burun ucu
-            [0.0, -330.0, -65.0],        # Çene
-            [-225.0, 170.0, -135.0],     # Sol göz köşesi
-            [225.0, 170.0, -135.0],      # Sağ göz köşesi
-            [-150.0, -150.0, -125.0],    # Sol ağız köşesi
-            [150.0, -150.0, -125.0]      # Sağ ağız köşesi
-        ], dtype=np.float64)
-        # MediaPipe landmark indexleri
-        image_points_idx = [1, 152, 263, 33, 287, 57]
-        h, w, _ = image_shape
-        lm = landmarks.landmark
-        image_points = np.array([
-            [lm[idx].x * w, lm[idx].y * h] for idx in image_points_idx
-        ], dtype=np.float64)
+    def reset(self):
+        """Forget debounce state, e.g. before processing a new clip."""
+        self.last_euler = None
+        self.last_movement = None
+        self.last_movement_time = 0
+        self.stable_movement = None
+        self.stable_start_time = 0
+        self._prev_gray = None
+        self._tracked_points = None
+        self._frames_since_inference = 0
+
+    def _solve_head_pose(self, image_points, image_shape):
+        """Euler angles (pitch, yaw, roll) from the six pose points in pixels."""
+        model_points = self.MODEL_POINTS
+        h, w = image_shape[:2]
         # Kamera matrisi
         focal_length = w
         center = (w / 2, h / 2)
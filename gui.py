@@ -4,13 +4,25 @@ import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QPushButton, QTextEdit, 
                             QSlider, QFrame, QSplitter, QProgressBar, QDialog, QComboBox, QFormLayout)
-from PyQt5.QtGui import QImage, QPixmap, QFont, QIcon
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QSize
+from PyQt5.QtGui import QImage, QPixmap, QFont, QIcon, QPainter, QColor
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QSize, QThread, QRectF, QPointF
 from PyQt5.QtWidgets import QFileDialog, QMessageBox
+import threading
+import time
 import traceback
 from face_detector import FaceDetector
+from profiles import PROFILES, DEFAULT_PROFILE
+from trace_cache import DEFAULT_TRACE_PATH, TraceWriter
+from shortcuts import COMMANDS, MOVEMENT_KEYS, DEFAULT_SHORTCUT_MAP, run_shortcut
 
 class VideoWidget(QLabel):
+    """
+    Shows the latest camera frame with the detection overlay drawn at paint time.
+
+    Frames and detection results are only stored by reference; the BGR frame is
+    wrapped in a QImage and scaled by QPainter when Qt actually repaints the
+    widget, so hidden or coalesced frames cost nothing.
+    """
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setMinimumSize(640, 360)
@@ -22,24 +34,120 @@ class VideoWidget(QLabel):
                 border-radius: 10px;
             }
         """)
-        self.overlay_label = QLabel(self)
-        self.overlay_label.setStyleSheet("color: red; font-size: 24px; font-weight: bold; background: rgba(0,0,0,0.5);")
-        self.overlay_label.setAlignment(Qt.AlignCenter)
-        self.overlay_label.hide()
+        self.overlay_font = QFont('Arial', 18, QFont.Bold)
+        self.draw_landmarks = True
+        self._frame = None
+        self._pose_points = None
+        self._frame_size = None
+        self._overlay_text = None
+
+    def set_frame(self, frame):
+        self._frame = frame
+        self.update()
+
+    def set_detection(self, pose_points, frame_size, overlay_text=None):
+        """
+        Store the latest detection result for the overlay.
+
+        Args:
+            pose_points: (6, 2) pixel coordinates or None
+            frame_size: (width, height) of the frame the points refer to
+            overlay_text: Warning text to show over the video
+        """
+        self._pose_points = pose_points
+        self._frame_size = frame_size
+        self._overlay_text = overlay_text
+        self.update()
 
     def update_frame(self, frame, overlay_text=None):
-        h, w, ch = frame.shape
-        bytes_per_line = ch * w
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        q_img = QImage(frame_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(q_img)
-        self.setPixmap(pixmap.scaled(self.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
-        if overlay_text:
-            self.overlay_label.setText(overlay_text)
-            self.overlay_label.resize(self.size())
-            self.overlay_label.show()
-        else:
-            self.overlay_label.hide()
+        self._overlay_text = overlay_text
+        self.set_frame(frame)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        frame = self._frame
+        if frame is None:
+            return
+        h, w = frame.shape[:2]
+        # Kopyasız: QImage doğrudan BGR numpy tamponunu kullanır
+        image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888)
+        area = self.contentsRect()
+        scale = min(area.width() / w, area.height() / h)
+        target = QRectF(area.x() + (area.width() - w * scale) / 2, area.y() + (area.height() - h * scale) / 2,
+                        w * scale, h * scale)
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.drawImage(target, image)
+        if self.draw_landmarks and self._pose_points is not None and self._frame_size:
+            sx = target.width() / self._frame_size[0]
+            sy = target.height() / self._frame_size[1]
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(0, 255, 0))
+            radius = max(2.0, 5 * scale)
+            for x, y in self._pose_points:
+                painter.drawEllipse(QPointF(target.x() + x * sx, target.y() + y * sy), radius, radius)
+        if self._overlay_text:
+            painter.fillRect(self.rect(), QColor(0, 0, 0, 128))
+            painter.setPen(QColor(255, 0, 0))
+            painter.setFont(self.overlay_font)
+            painter.drawText(self.rect(), Qt.AlignCenter, self._overlay_text)
+        painter.end()
+
+class InferenceWorker(QThread):
+    """
+    Runs FaceDetector on the most recent submitted frame in its own thread.
+
+    Frames arriving while an inference is running replace each other, so the
+    detector always works on the newest frame at whatever rate it can sustain.
+    """
+    result_ready = pyqtSignal(object, object)
+
+    def __init__(self, face_detector, parent=None):
+        super().__init__(parent)
+        self.face_detector = face_detector
+        self._cond = threading.Condition()
+        self._frame = None
+        self._calls = []
+        self._running = True
+
+    def submit(self, frame):
+        with self._cond:
+            self._frame = frame
+            self._cond.notify()
+
+    def call_soon(self, fn):
+        """Run fn in the worker thread before the next inference."""
+        with self._cond:
+            self._calls.append(fn)
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and self._frame is None and not self._calls:
+                    self._cond.wait()
+                if not self._running:
+                    break
+                frame, self._frame = self._frame, None
+                calls, self._calls = self._calls, []
+            for fn in calls:
+                fn()
+            if frame is None:
+                continue
+            try:
+                _, detection_result = self.face_detector.detect_face(frame, draw=False)
+            except Exception as e:
+                print("Hata:", e)
+                traceback.print_exc()
+                continue
+            self.result_ready.emit(frame, detection_result)
 
 class CalibrationWidget(QWidget):
     def __init__(self, parent=None):
@@ -181,8 +289,8 @@ class ShortcutSettingsDialog(QDialog):
         super().__init__(parent)
         self.setWindowTitle("Kafa Hareketi Kısayolları")
         self.setMinimumWidth(300)
-        self.movement_keys = ['right', 'left', 'up', 'down']
-        self.commands = ['Sonraki Şarkı', 'Önceki Şarkı', 'Oynat/Duraklat', 'Sessize Al', 'Hiçbiri']
+        self.movement_keys = list(MOVEMENT_KEYS)
+        self.commands = list(COMMANDS)
         self.command_map = current_map.copy() if current_map else {k: 'Sonraki Şarkı' for k in self.movement_keys}
         layout = QFormLayout(self)
         self.combos = {}
@@ -201,20 +309,24 @@ class ShortcutSettingsDialog(QDialog):
         return self.command_map
 
 class HeadControlApp(QMainWindow):
+    recording_failed = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
+        self.recording = False
         self.setup_ui()
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_frame)
         self.cap = None
         self.face_detector = None
+        self.inference_worker = None
         self.music_controller = None
-        self.shortcut_map = {
-            'right': 'Sonraki Şarkı',
-            'left': 'Önceki Şarkı',
-            'up': 'Oynat/Duraklat',
-            'down': 'Oynat/Duraklat',
-        }
+        self.event_bus = None
+        self.roll_volume = None
+        self.detection_count = 0
+        self.shortcut_map = dict(DEFAULT_SHORTCUT_MAP)
+        self.recording_failed.connect(self.on_recording_failed)
+        self.set_profile(PROFILES[DEFAULT_PROFILE])
 
     def setup_ui(self):
         self.setWindowTitle("Head Movement Music Control")
@@ -252,6 +364,13 @@ class HeadControlApp(QMainWindow):
         settings_btn.clicked.connect(self.open_settings)
         header_layout.addWidget(settings_btn)
 
+        # Landmark kaydı (trace_cache)
+        self.record_btn = QPushButton("Kayıt", self)
+        self.record_btn.setFixedWidth(100)
+        self.record_btn.setCheckable(True)
+        self.record_btn.toggled.connect(self.toggle_recording)
+        header_layout.addWidget(self.record_btn)
+
         self.setStyleSheet("""
             QMainWindow, QWidget {
                 background-color: #121212;
@@ -265,21 +384,70 @@ class HeadControlApp(QMainWindow):
         self.face_detector = face_detector
         self.music_controller = music_controller
 
+    def set_profile(self, profile):
+        # Yakalama boyutu, kare hızı ve çizim performans profilinden gelir
+        self.capture_size = profile['capture_size']
+        self.frame_interval_ms = int(1000 / profile['target_fps'])
+        self.video_widget.draw_landmarks = profile['draw']
+
+    def set_event_bus(self, event_bus):
+        self.event_bus = event_bus
+
+    def set_roll_volume(self, roll_volume):
+        self.roll_volume = roll_volume
+
     def start_camera(self, camera_index=0):
         self.cap = cv2.VideoCapture(camera_index)
         if not self.cap.isOpened():
             QMessageBox.critical(self, "Error", "Could not open camera.")
             return False
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 360)
-        self.timer.start(33)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.capture_size[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.capture_size[1])
+        self.start_inference_worker()
+        self.timer.start(self.frame_interval_ms)
         return True
 
+    def start_inference_worker(self):
+        """Run detection in an InferenceWorker thread (also usable without a camera)."""
+        # Çıkarım ayrı iş parçacığında; görüntü her yakalanan karede yenilenir
+        if self.face_detector and self.inference_worker is None:
+            self.inference_worker = InferenceWorker(self.face_detector, self)
+            self.inference_worker.result_ready.connect(self.on_detection)
+            self.inference_worker.start()
+
     def open_settings(self):
         dlg = ShortcutSettingsDialog(self, self.shortcut_map)
         if dlg.exec_():
             self.shortcut_map = dlg.get_map()
 
+    def toggle_recording(self, enabled):
+        # İstenen durum ana iş parçacığında tutulur; dosya çıkarım iş parçacığında açılır/kapanır
+        self.recording = enabled
+        if self.face_detector:
+            self._call_in_inference_thread(self._update_recording)
+
+    def _update_recording(self):
+        recorder = self.face_detector.recorder
+        if self.recording and recorder is None:
+            try:
+                self.face_detector.recorder = TraceWriter(DEFAULT_TRACE_PATH, self.face_detector.num_landmarks)
+            except (OSError, ValueError) as e:
+                self.recording_failed.emit(str(e))
+        elif not self.recording and recorder is not None:
+            recorder.close()
+            self.face_detector.recorder = None
+
+    def on_recording_failed(self, message):
+        QMessageBox.warning(self, "Kayıt Hatası", message)
+        self.record_btn.setChecked(False)
+
+    def _call_in_inference_thread(self, fn):
+        # Dedektör durumu yalnızca çıkarım iş parçacığından değiştirilir
+        if self.inference_worker is not None:
+            self.inference_worker.call_soon(fn)
+        else:
+            fn()
+
     def update_frame(self):
         if self.cap is None or not self.cap.isOpened():
             return
@@ -288,50 +456,78 @@ class HeadControlApp(QMainWindow):
             if not ret:
                 return
             frame = cv2.flip(frame, 1)
-            overlay_text = None
+            self.video_widget.set_frame(frame)
             if self.face_detector:
-                processed_frame, detection_result = self.face_detector.detect_face(frame)
-                movement = detection_result.get('movement')
-                euler = detection_result.get('euler')
-                # 7: Yüz algılanamazsa uyarı
-                if euler is None:
-                    overlay_text = "Yüz algılanamadı"
+                if self.inference_worker is not None:
+                    self.inference_worker.submit(frame)
                 else:
-                    # 3: Kalibrasyon/merkezde tutma yardımı
-                    h, w, _ = frame.shape
-                    nose_x = None
-                    try:
-                        for face_landmarks in self.face_detector.face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).multi_face_landmarks or []:
-                            nose_x = int(face_landmarks.landmark[1].x * w)
-                            break
-                    except:
-                        pass
-                    if nose_x is not None:
-                        center_x = w // 2
-                        if abs(nose_x - center_x) > w * 0.18:
-                            overlay_text = "Yüzü merkeze al"
-                # --- Kısayol eşleşmesi ---
-                if movement and self.music_controller:
-                    cmd = self.shortcut_map.get(movement, None)
-                    if cmd == 'Sonraki Şarkı':
-                        self.music_controller.next_track()
-                    elif cmd == 'Önceki Şarkı':
-                        self.music_controller.previous_track()
-                    elif cmd == 'Oynat/Duraklat':
-                        self.music_controller.toggle_play_pause()
-                    elif cmd == 'Sessize Al':
-                        self.music_controller.send_media_key(0xAD)  # VK_VOLUME_MUTE
-                self.video_widget.update_frame(processed_frame, overlay_text)
-            else:
-                self.video_widget.update_frame(frame)
+                    _, detection_result = self.face_detector.detect_face(frame, draw=False)
+                    self.on_detection(frame, detection_result)
         except Exception as e:
             print("Hata:", e)
             traceback.print_exc()
 
+    def step_frame(self, timeout=2.0):
+        """
+        Capture one frame and wait until its detection result has been handled.
+
+        Used by harnesses (soak.py, daemon.py --benchmark) that drive the app
+        without the timer. With an inference worker the result arrives through
+        the queued result_ready signal, exactly as in the running app.
+
+        Returns:
+            bool: True if a detection result was handled within timeout
+        """
+        before = self.detection_count
+        self.update_frame()
+        deadline = time.perf_counter() + timeout
+        while True:
+            QApplication.processEvents()
+            if self.detection_count != before:
+                return True
+            if self.inference_worker is None or time.perf_counter() > deadline:
+                return False
+            time.sleep(0.0005)
+
+    def on_detection(self, frame, detection_result):
+        self.detection_count += 1
+        overlay_text = None
+        movement = detection_result.get('movement')
+        euler = detection_result.get('euler')
+        pose_points = detection_result.get('pose_points')
+        h, w, _ = frame.shape
+        if self.event_bus:
+            self.event_bus.publish(detection_result)
+        if self.roll_volume:
+            self.roll_volume.update(euler, detection_result.get('timestamp'))
+        # 7: Yüz algılanamazsa uyarı
+        if euler is None:
+            overlay_text = "Yüz algılanamadı"
+        elif pose_points is not None:
+            # 3: Kalibrasyon/merkezde tutma yardımı, pose_points[0]: burun ucu (landmark 1)
+            nose_x = int(pose_points[0, 0])
+            center_x = w // 2
+            if abs(nose_x - center_x) > w * 0.18:
+                overlay_text = "Yüzü merkeze al"
+        # --- Kısayol eşleşmesi ---
+        run_shortcut(self.music_controller, movement, self.shortcut_map)
+        self.video_widget.set_detection(pose_points, (w, h), overlay_text)
+
     def closeEvent(self, event):
         self.timer.stop()
+        if self.inference_worker is not None:
+            self.inference_worker.stop()
+            self.inference_worker = None
+        # Çıkarım iş parçacığı durdu; bekleyen çağrılar atıldığı için kayıt burada kapatılır
+        self.recording = False
+        if self.face_detector:
+            self._update_recording()
         if self.cap and self.cap.isOpened():
             self.cap.release()
         if self.music_controller:
             self.music_controller.cleanup()
+        if self.event_bus:
+            self.event_bus.close()
+        if self.roll_volume:
+            self.roll_volume.stop()
         event.accept()
\ No newline at end of file
@@ -10,8 +10,17 @@ Controls:
 - Turn head left: Previous song
 - Move head up/down: Pause/Play music
 - Special movement (rapid nodding): Shuffle playlist
+
+Options:
+- --event-port [PORT]: Publish detection results to local subscribers (see event_bus.py)
+- --track-interval N: Run FaceMesh every N frames, track pose points with optical flow in between
+  (overrides the profile)
+- --roll-volume rate|target: Continuous volume control with head roll (tilt)
+- --profile quality|balanced|low-power|auto: Performance profile (default: auto, benchmarked
+  at first launch and cached); --rebenchmark measures again
 """
 
+import argparse
 import sys
 import os
 import cv2
@@ -23,6 +32,9 @@ from PyQt5.QtWidgets import QApplication, QMessageBox
 from face_detector import FaceDetector
 from music_controller import MusicController
 from gui import HeadControlApp
+from event_bus import DEFAULT_EVENT_PORT, EventBus
+from profiles import PROFILES, create_face_detector, resolve_profile
+from volume_control import RollVolumeControl
 from utils import get_device, FPSCounter, create_directory_if_not_exists
 
 def check_requirements():
@@ -41,16 +53,26 @@ def main():
     if not check_requirements():
         return 1
         
+    parser = argparse.ArgumentParser(description="Head movement music control")
+    parser.add_argument('--event-port', type=int, default=None, nargs='?', const=DEFAULT_EVENT_PORT)
+    parser.add_argument('--track-interval', type=int, default=None)
+    parser.add_argument('--profile', default='auto', choices=['auto'] + list(PROFILES))
+    parser.add_argument('--rebenchmark', action='store_true')
+    parser.add_argument('--roll-volume', choices=['rate', 'target'], default=None)
+    args, qt_args = parser.parse_known_args()
+
     # Initialize PyQt application
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_args)
     
     # Create the main window
     main_window = HeadControlApp()
     
     # Initialize face detector
     try:
-        face_detector = FaceDetector()
-        print("Face detector initialized successfully.")
+        profile_name = resolve_profile(args.profile, args.rebenchmark)
+        main_window.set_profile(PROFILES[profile_name])
+        face_detector = create_face_detector(profile_name, track_interval=args.track_interval)
+        print(f"Face detector initialized successfully (profile: {profile_name}).")
     except Exception as e:
         QMessageBox.critical(
             None, 
@@ -73,6 +95,19 @@ def main():
     
     # Set controllers in the main window
     main_window.set_controllers(face_detector, music_controller)
+
+    # Optional analog volume control with head roll
+    if args.roll_volume:
+        main_window.set_roll_volume(RollVolumeControl(music_controller, mode=args.roll_volume).start())
+
+    # Optional event bus for other local applications
+    if args.event_port is not None:
+        try:
+            event_bus = EventBus(port=args.event_port).start()
+            main_window.set_event_bus(event_bus)
+            print(f"Event bus listening on 127.0.0.1:{event_bus.address[1]}")
+        except OSError as e:
+            print(f"Failed to start event bus: {str(e)}")
     
     # Start the camera
     if not main_window.start_camera():
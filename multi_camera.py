@@ -0,0 +1,248 @@
+"""
+Multi-camera input with per-camera worker processes and best-view selection.
+
+Every camera gets its own process that owns the capture device and a
+FaceDetector, so capture and inference of different cameras run in parallel
+on separate cores (on Linux each worker is also pinned to one core). Workers
+only send small per-frame pose messages to the parent; frames never cross the
+process boundary.
+
+The parent combines the freshest message of each camera:
+- 'select': use the camera with the best view score (face size times the
+  cosine of yaw and pitch). The current camera is kept while it sees the face
+  and is only replaced when another camera has been clearly better for
+  switch_time seconds, so a deliberate head turn is not mistaken for a view
+  change.
+- 'fuse': every camera's pose is taken relative to its own slowly adapting
+  neutral pose and the deviations are averaged, weighted by the view score
+  and reported around the frontal pose. This needs no extrinsic calibration
+  between the cameras. The neutral pose only adapts (with a time constant of
+  baseline_time seconds) while the head is near it; a held head turn freezes
+  it, so returning to neutral does not read as the opposite movement. Only a
+  deviation that lasts longer than hold_time is treated as a new neutral pose.
+
+Movement analysis and debouncing then run once, on the combined pose, with the
+same FaceDetector logic as the single-camera path.
+"""
+
+import math
+import multiprocessing
+import os
+import queue
+import time
+
+def _camera_worker(camera_index, core, profile_name, capture_size, track_interval, out_queue, stop_event):
+    """Capture and detect on one camera; send (camera, timestamp, euler, face_size) tuples."""
+    if core is not None and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, {core})
+        except OSError:
+            pass
+    import cv2
+    # Her kamera kendi çekirdeğinde; OpenCV iş parçacıkları çekişmesin
+    cv2.setNumThreads(1)
+    from profiles import create_face_detector
+
+    detector = create_face_detector(profile_name, track_interval=track_interval)
+    cap = cv2.VideoCapture(camera_index)
+    if not cap.isOpened():
+        out_queue.put((camera_index, time.time(), 'error', 0.0))
+        return
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, capture_size[0])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, capture_size[1])
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                time.sleep(0.05)
+                continue
+            frame = cv2.flip(frame, 1)
+            _, result = detector.detect_face(frame, draw=False)
+            euler = result['euler']
+            face_size = 0.0
+            points = result['pose_points']
+            if points is not None:
+                # Göz köşeleri arası mesafe / kare genişliği
+                face_size = float(abs(points[2, 0] - points[3, 0])) / frame.shape[1]
+            out_queue.put((camera_index, result['timestamp'],
+                           None if euler is None else tuple(float(a) for a in euler), face_size))
+    finally:
+        cap.release()
+
+# Kameraya dönük yüzün pozu (pitch, yaw, roll): model y yukarı, görüntü y aşağı
+FRONTAL_POSE = (180.0, 0.0, 0.0)
+# Nötr poz yalnızca sapma bu sınırların içindeyken uyarlanır (pitch, yaw, roll);
+# pitch/yaw FaceDetector._analyze_head_movement eşikleri
+NEUTRAL_LIMITS = (15.0, 20.0, 10.0)
+
+def _wrap(angle):
+    """Wrap an angle in degrees to [-180, 180)."""
+    return (angle + 180.0) % 360.0 - 180.0
+
+def view_score(euler, face_size):
+    """Higher for larger, more frontal faces; 0 if no face."""
+    if euler is None:
+        return 0.0
+    pitch = math.radians(_wrap(euler[0] - FRONTAL_POSE[0]))
+    yaw = math.radians(_wrap(euler[1] - FRONTAL_POSE[1]))
+    return face_size * max(0.0, math.cos(yaw)) * max(0.0, math.cos(pitch))
+
+class MultiCameraSource:
+    """Runs one detector process per camera and combines their poses."""
+    def __init__(self, cameras, profile_name, capture_size=(640, 360), track_interval=None, mode='select',
+                 switch_margin=0.25, switch_time=1.0, max_age=0.25,
+                 baseline_time=20.0, hold_time=5.0):
+        """
+        Initialize the multi-camera source.
+
+        Args:
+            cameras: List of camera indices
+            profile_name: Performance profile for the per-camera detectors
+            capture_size: Requested camera resolution (width, height)
+            track_interval: Optical-flow tracking override (see FaceDetector)
+            mode: 'select' or 'fuse'
+            switch_margin: Relative score advantage needed to switch cameras (select)
+            switch_time: Seconds the advantage must last before switching (select)
+            max_age: Messages older than this (seconds) are ignored
+            baseline_time: Time constant in seconds of the per-camera neutral pose (fuse)
+            hold_time: Seconds a deviation beyond NEUTRAL_LIMITS must last before
+                the neutral pose adapts to it (fuse)
+        """
+        if mode not in ('select', 'fuse'):
+            raise ValueError(f"Unknown multi-camera mode: {mode}")
+        from face_detector import FaceDetector
+        self.cameras = list(cameras)
+        self.profile_name = profile_name
+        self.capture_size = capture_size
+        self.track_interval = track_interval
+        self.mode = mode
+        self.switch_margin = switch_margin
+        self.switch_time = switch_time
+        self.max_age = max_age
+        self.baseline_time = baseline_time
+        self.hold_time = hold_time
+        # Hareket analizi ve debounce tek bir yerde, birleşik poz üzerinde
+        self.analyzer = FaceDetector(inference=False)
+        self.active_camera = None
+        self._challenger = None
+        self._challenger_since = 0.0
+        self._latest = {}
+        self._baselines = {}
+        self._queue = multiprocessing.Queue()
+        self._stop_event = multiprocessing.Event()
+        self._processes = []
+
+    def start(self):
+        cores = os.cpu_count() or 1
+        for i, camera in enumerate(self.cameras):
+            process = multiprocessing.Process(
+                target=_camera_worker, name=f"camera-{camera}", daemon=True,
+                args=(camera, i % cores, self.profile_name, self.capture_size, self.track_interval,
+                      self._queue, self._stop_event))
+            process.start()
+            self._processes.append(process)
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+    def poll(self, timeout=0.1):
+        """
+        Wait for the next camera message and return the combined detection.
+
+        Returns:
+            Detection result dictionary ({'movement', 'euler', 'timestamp',
+            'camera'}) or None if no message arrived within timeout
+        """
+        try:
+            message = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        # Kuyrukta biriken mesajları boşalt; yalnızca en yenileri önemli
+        updated = set()
+        while True:
+            camera, timestamp, euler, face_size = message
+            if euler == 'error':
+                print(f"Could not open camera {camera}.")
+            else:
+                self._latest[camera] = (timestamp, euler, face_size)
+                updated.add(camera)
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+        now = time.time()
+        fresh = {c: m for c, m in self._latest.items() if now - m[0] <= self.max_age}
+        if self.mode == 'select':
+            euler, camera = self._select(fresh, now)
+        else:
+            euler, camera = self._fuse(fresh, updated)
+        movement = self.analyzer._analyze_head_movement(euler)
+        return {'movement': self.analyzer._debounce(movement, now), 'euler': euler,
+                'timestamp': now, 'camera': camera}
+
+    def _select(self, fresh, now):
+        scores = {c: view_score(euler, size) for c, (_, euler, size) in fresh.items()}
+        best = max(scores, key=scores.get) if scores else None
+        if best is None or scores[best] <= 0:
+            return None, self.active_camera
+        current = scores.get(self.active_camera, 0.0)
+        if current <= 0:
+            # Aktif kamera yüzü kaybetti: hemen en iyi görüşe geç
+            self.active_camera = best
+            self._challenger = None
+        elif best != self.active_camera and scores[best] > current * (1 + self.switch_margin):
+            if self._challenger != best:
+                self._challenger, self._challenger_since = best, now
+            elif now - self._challenger_since >= self.switch_time:
+                self.active_camera = best
+                self._challenger = None
+        else:
+            self._challenger = None
+        return fresh[self.active_camera][1], self.active_camera
+
+    def _fuse(self, fresh, updated):
+        total = 0.0
+        fused = [0.0, 0.0, 0.0]
+        for camera, (timestamp, euler, size) in fresh.items():
+            weight = view_score(euler, size)
+            if weight <= 0:
+                continue
+            state = self._baselines.get(camera)
+            if state is None:
+                # [nötr poz, son güncelleme zamanı, sınır dışına çıkış zamanı]
+                state = self._baselines[camera] = [list(euler), timestamp, None]
+            baseline = state[0]
+            deviation = [_wrap(e - b) for e, b in zip(euler, baseline)]
+            for i in range(3):
+                fused[i] += weight * deviation[i]
+            total += weight
+            # Sadece bu kameranın yeni mesajında; hız kamera sayısına bağlı değil
+            if camera in updated:
+                self._adapt_baseline(state, deviation, timestamp)
+        if total <= 0:
+            return None, None
+        best = max(fresh, key=lambda c: view_score(fresh[c][1], fresh[c][2]))
+        # Sapmalar tek kamera yolu ile aynı açı düzeninde döndürülür
+        return tuple(_wrap(f + v / total) for f, v in zip(FRONTAL_POSE, fused)), best
+
+    def _adapt_baseline(self, state, deviation, timestamp):
+        baseline, last_time, outside_since = state
+        dt = min(max(timestamp - last_time, 0.0), 1.0)
+        state[1] = timestamp
+        if any(abs(d) > limit for d, limit in zip(deviation, NEUTRAL_LIMITS)):
+            # Tutulan kafa hareketi nötr pozu kaydırmamalı
+            if outside_since is None:
+                state[2] = timestamp
+            if timestamp - state[2] < self.hold_time:
+                return
+        else:
+            state[2] = None
+        alpha = 1.0 - math.exp(-dt / self.baseline_time)
+        for i in range(3):
+            baseline[i] = _wrap(baseline[i] + alpha * deviation[i])
@@ -14,6 +14,11 @@ VK_VOLUME_UP = 0xAF
 VK_VOLUME_DOWN = 0xAE
 VK_VOLUME_MUTE = 0xAD
 
+# Her ses tuşu Windows'ta sistem sesini yaklaşık %2 değiştirir
+VOLUME_STEP = 0.02
+# Tek SendInput çağrısında gönderilebilecek en fazla ses adımı
+MAX_VOLUME_BURST = 50
+
 # Windows API için gerekli yapılar
 user32 = ctypes.WinDLL('user32', use_last_error=True)
 
@@ -37,7 +42,12 @@ class INPUT(ctypes.Structure):
     _fields_ = (("type", wintypes.DWORD),
                 ("_input", _INPUT))
 
+# SendInput için tek sefer ayrılan ek bilgi işaretçisi (her tuşta yeniden ayrılmaz)
+_EXTRA_INFO = ctypes.pointer(ctypes.c_ulong(0))
+
 class MusicController:
+    volume_step = VOLUME_STEP
+
     def __init__(self, music_dir="music"):
         """
         Initialize the music controller.
@@ -54,6 +64,15 @@ class MusicController:
         
         # Log messages
         self.log_messages = []
+
+        # Reusable SendInput buffer
+        self._inputs = (INPUT * 1)()
+        self._inputs[0].type = INPUT_KEYBOARD
+        self._inputs[0].ki.dwExtraInfo = _EXTRA_INFO
+        self._burst_inputs = (INPUT * (2 * MAX_VOLUME_BURST))()
+        for item in self._burst_inputs:
+            item.type = INPUT_KEYBOARD
+            item.ki.dwExtraInfo = _EXTRA_INFO
         
         self.add_log("Media controller initialized - ready to control system media")
         
@@ -65,13 +84,11 @@ class MusicController:
             key_code: Virtual key code to send
         """
         # Prepare input structure for key down
-        inputs = (INPUT * 1)()
-        inputs[0].type = INPUT_KEYBOARD
+        inputs = self._inputs
         inputs[0].ki.wVk = key_code
         inputs[0].ki.wScan = 0
         inputs[0].ki.dwFlags = 0
         inputs[0].ki.time = 0
-        inputs[0].ki.dwExtraInfo = ctypes.pointer(ctypes.c_ulong(0))
         
         # Send key down
         user32.SendInput(1, ctypes.byref(inputs), ctypes.sizeof(INPUT))
@@ -87,6 +104,31 @@ class MusicController:
         
         return True
     
+    def send_volume_steps(self, steps):
+        """
+        Send several volume key presses in a single SendInput call.
+
+        Args:
+            steps: Number of steps, positive for volume up, negative for down
+
+        Returns:
+            Number of steps actually sent (capped at MAX_VOLUME_BURST)
+        """
+        count = min(abs(int(steps)), MAX_VOLUME_BURST)
+        if count == 0:
+            return 0
+        key_code = VK_VOLUME_UP if steps > 0 else VK_VOLUME_DOWN
+        inputs = self._burst_inputs
+        for i in range(count):
+            inputs[2 * i].ki.wVk = key_code
+            inputs[2 * i].ki.dwFlags = 0
+            inputs[2 * i + 1].ki.wVk = key_code
+            inputs[2 * i + 1].ki.dwFlags = KEYEVENTF_KEYUP
+        user32.SendInput(2 * count, inputs, ctypes.sizeof(INPUT))
+        sign = 1 if steps > 0 else -1
+        self.volume = max(0.0, min(1.0, self.volume + sign * count * VOLUME_STEP))
+        return sign * count
+
     def play(self):
         """Play/Pause the current track."""
         try:
@@ -135,23 +177,14 @@ class MusicController:
         """
         # Adjust system volume (simplified)
         try:
-            # Convert volume to number of key presses (0.0-1.0 to 0-10 range)
+            # Convert volume to number of key presses (one press = VOLUME_STEP)
             current_volume = self.volume
             target_volume = max(0.0, min(1.0, volume))
             
-            # Determine if we need to increase or decrease volume
-            if target_volume > current_volume:
-                # Increase volume
-                steps = int((target_volume - current_volume) * 10)
-                for _ in range(steps):
-                    self.send_media_key(VK_VOLUME_UP)
-            else:
-                # Decrease volume
-                steps = int((current_volume - target_volume) * 10)
-                for _ in range(steps):
-                    self.send_media_key(VK_VOLUME_DOWN)
+            # Send all presses in one burst; send_volume_steps updates self.volume
+            steps = round((target_volume - current_volume) / VOLUME_STEP)
+            self.send_volume_steps(steps)
             
-            self.volume = target_volume
             self.add_log(f"Volume set to {int(self.volume * 100)}%")
             return True
         except Exception as e:
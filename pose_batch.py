@@ -0,0 +1,254 @@
+"""
+Batched closed-form head pose estimation for offline workloads.
+
+FaceDetector._solve_head_pose calls cv2.solvePnP and scipy once per frame,
+which is fine live but dominates when millions of recorded frames are
+replayed. estimate_head_pose() solves a whole (T, 6, 2) array of pose points
+at once with NumPy:
+
+1. Weak-perspective fit: the centered model points are mapped to the centered,
+   normalized image points by a least-squares affine projection (a fixed 3x6
+   pseudo-inverse shared by all frames). Its two rows are orthonormalized into
+   a rotation with a batched SVD; the scale gives the depth.
+2. Gauss-Newton refinement: a few batched steps on the full perspective
+   reprojection error, over a rotation-vector update and the translation
+   (6 x 6 normal equations per frame).
+3. Euler angles in the same 'xyz' convention as scipy's Rotation.as_euler
+   used by the per-frame path.
+
+The camera model matches the live path (focal length = image width, principal
+point at the image center, no distortion). Where both solvers reach the same
+minimum the angles agree with solvePnP to well under 0.01 degrees. The
+refinement starts from a pose in front of the camera, so it does not fall into
+the mirrored solution behind the camera that the iterative solvePnP sometimes
+returns for small, distant faces.
+
+Usage:
+    python pose_batch.py [recordings/landmarks.hmlt] [--check 2000]
+compares the estimator with the solvePnP path and reports the throughput of
+both, on a landmark trace or on synthetic poses.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+# face_detector.FaceDetector.MODEL_POINTS ile aynı (mediapipe içe aktarmadan)
+MODEL_POINTS = np.array([
+    [0.0, 0.0, 0.0],             # Burun ucu
+    [0.0, -330.0, -65.0],        # Çene
+    [-225.0, 170.0, -135.0],     # Sol göz köşesi
+    [225.0, 170.0, -135.0],      # Sağ göz köşesi
+    [-150.0, -150.0, -125.0],    # Sol ağız köşesi
+    [150.0, -150.0, -125.0]      # Sağ ağız köşesi
+], dtype=np.float64)
+
+CHUNK_SIZE = 2048
+
+_MODEL_MEAN = MODEL_POINTS.mean(axis=0)
+_MODEL_CENTERED = MODEL_POINTS - _MODEL_MEAN
+# Tüm kareler için ortak en küçük kareler çözücüsü (3 x 6)
+_MODEL_PINV = np.linalg.pinv(_MODEL_CENTERED)
+
+def _skew(v):
+    """(T, 3) vectors -> (T, 3, 3) cross-product matrices."""
+    s = np.zeros(v.shape[:-1] + (3, 3))
+    s[..., 0, 1], s[..., 0, 2] = -v[..., 2], v[..., 1]
+    s[..., 1, 0], s[..., 1, 2] = v[..., 2], -v[..., 0]
+    s[..., 2, 0], s[..., 2, 1] = -v[..., 1], v[..., 0]
+    return s
+
+def _rodrigues(omega):
+    """(T, 3) rotation vectors -> (T, 3, 3) rotation matrices."""
+    theta = np.linalg.norm(omega, axis=1)[:, None, None]
+    k = _skew(omega)
+    small = theta < 1e-8
+    safe = np.where(small, 1.0, theta)
+    a = np.where(small, 1.0, np.sin(safe) / safe)
+    b = np.where(small, 0.5, (1.0 - np.cos(safe)) / safe ** 2)
+    return np.eye(3) + a * k + b * (k @ k)
+
+def _weak_perspective(points):
+    """Initial rotation and translation from a scaled orthographic fit."""
+    centroid = points.mean(axis=1)
+    affine = np.matmul(_MODEL_PINV, points - centroid[:, None, :]).transpose(0, 2, 1)
+    r1, r2 = affine[:, 0], affine[:, 1]
+    scale = 0.5 * (np.linalg.norm(r1, axis=1) + np.linalg.norm(r2, axis=1))
+    # En yakın dönme matrisi (SVD ile ortonormalleştirme)
+    m = np.stack([r1, r2, np.cross(r1, r2) / np.maximum(scale, 1e-12)[:, None]], axis=1)
+    u, _, vt = np.linalg.svd(m)
+    d = np.sign(np.linalg.det(u @ vt))
+    u[:, :, 2] *= d[:, None]
+    rotation = u @ vt
+    depth = 1.0 / np.maximum(scale, 1e-12)
+    rotated_mean = rotation @ _MODEL_MEAN
+    translation = np.empty((len(points), 3))
+    translation[:, :2] = centroid * depth[:, None] - rotated_mean[:, :2]
+    translation[:, 2] = depth - rotated_mean[:, 2]
+    return rotation, translation
+
+def _refine(points, rotation, translation, iterations, tolerance=1e-10):
+    """Batched Gauss-Newton on the perspective reprojection error."""
+    count = len(points)
+    # Parametre x artık (u0..u5, v0..v5) düzeninde transpoze Jacobian
+    jt = np.zeros((count, 6, 12))
+    for _ in range(iterations):
+        rotated = np.matmul(rotation, MODEL_POINTS.T)
+        qx, qy, qz = rotated[:, 0], rotated[:, 1], rotated[:, 2]
+        z = qz + translation[:, 2:]
+        inv_z = 1.0 / np.where(np.abs(z) < 1e-9, 1e-9, z)
+        x = (qx + translation[:, 0:1]) * inv_z
+        y = (qy + translation[:, 1:2]) * inv_z
+        residual = np.concatenate([points[..., 0] - x, points[..., 1] - y], axis=1)[..., None]
+        # Soldan küçük dönme (omega) ve öteleme için projeksiyon türevleri
+        jt[:, 0, :6] = -x * qy * inv_z
+        jt[:, 1, :6] = (qz + x * qx) * inv_z
+        jt[:, 2, :6] = -qy * inv_z
+        jt[:, 3, :6] = inv_z
+        jt[:, 5, :6] = -x * inv_z
+        jt[:, 0, 6:] = -(qz + y * qy) * inv_z
+        jt[:, 1, 6:] = y * qx * inv_z
+        jt[:, 2, 6:] = qx * inv_z
+        jt[:, 4, 6:] = inv_z
+        jt[:, 5, 6:] = -y * inv_z
+        jtj = np.matmul(jt, jt.transpose(0, 2, 1))
+        # Tekil sistemlere karşı küçük sönümleme
+        jtj += 1e-12 * np.eye(6) * (np.trace(jtj, axis1=1, axis2=2)[:, None, None] + 1.0)
+        step = np.linalg.solve(jtj, np.matmul(jt, residual))[..., 0]
+        rotation = np.matmul(_rodrigues(step[:, :3]), rotation)
+        translation = translation + step[:, 3:]
+        if np.max(np.abs(step[:, :3])) < tolerance:
+            break
+    return rotation, translation
+
+def rotation_to_euler(rotation):
+    """
+    Euler angles of rotation matrices in scipy's extrinsic 'xyz' convention.
+
+    Args:
+        rotation: (T, 3, 3) rotation matrices
+
+    Returns:
+        (T, 3) angles in degrees (pitch, yaw, roll)
+    """
+    pitch = np.arctan2(rotation[:, 2, 1], rotation[:, 2, 2])
+    yaw = np.arcsin(np.clip(-rotation[:, 2, 0], -1.0, 1.0))
+    roll = np.arctan2(rotation[:, 1, 0], rotation[:, 0, 0])
+    return np.degrees(np.stack([pitch, yaw, roll], axis=1))
+
+def estimate_head_pose(image_points, image_size, iterations=6):
+    """
+    Estimate the head pose of many frames at once.
+
+    Args:
+        image_points: (T, 6, 2) pixel coordinates in MODEL_POINTS order
+            (FaceDetector.POSE_LANDMARKS, e.g. TraceReader.image_points())
+        image_size: (width, height) shared by all frames, or a (T, 2) array
+        iterations: Gauss-Newton steps after the weak-perspective fit
+            (0 returns the closed-form estimate)
+
+    Returns:
+        (T, 3) float64 Euler angles (pitch, yaw, roll) in degrees like
+        FaceDetector._solve_head_pose; rows with non-finite points are NaN
+    """
+    image_points = np.asarray(image_points, dtype=np.float64)
+    size = np.broadcast_to(np.asarray(image_size, dtype=np.float64), (len(image_points), 2))
+    euler = np.full((len(image_points), 3), np.nan)
+    valid = np.isfinite(image_points).all(axis=(1, 2)) & (size[:, 0] > 0)
+    rows = np.flatnonzero(valid)
+    # Ara diziler önbellekte kalsın diye parça parça çözülür
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        # Normalize kamera koordinatları: odak uzaklığı = genişlik, merkez = görüntü ortası
+        points = (image_points[chunk] - 0.5 * size[chunk][:, None, :]) / size[chunk, 0][:, None, None]
+        rotation, translation = _weak_perspective(points)
+        if iterations:
+            rotation, translation = _refine(points, rotation, translation, iterations)
+        euler[chunk] = rotation_to_euler(rotation)
+    return euler
+
+def _synthetic_points(count, image_size=(640, 360), seed=0):
+    """Project MODEL_POINTS with random head poses and landmark noise."""
+    from scipy.spatial.transform import Rotation
+    rng = np.random.default_rng(seed)
+    w, h = image_size
+    # Kameraya bakan yüz: x etrafında 180 derece + rastgele kafa hareketi
+    head = Rotation.from_euler('xyz', rng.uniform([-30, -45, -30], [30, 45, 30], (count, 3)), degrees=True)
+    rotation = (head * Rotation.from_euler('x', 180, degrees=True)).as_matrix()
+    translation = np.column_stack([rng.uniform(-200, 200, count), rng.uniform(-150, 150, count),
+                                   rng.uniform(1500, 4000, count)])
+    cam = np.matmul(rotation, MODEL_POINTS.T).transpose(0, 2, 1) + translation[:, None, :]
+    points = w * cam[..., :2] / cam[..., 2:] + np.array([w / 2, h / 2])
+    return points + rng.normal(0.0, 1.0, points.shape), np.tile([w, h], (count, 1))
+
+def _angle_error(a, b):
+    return np.abs((a - b + 180.0) % 360.0 - 180.0)
+
+def _pnp_behind_camera(image_points, image_size):
+    """Whether the live solvePnP call puts the head behind the camera."""
+    import cv2
+    w, h = image_size
+    camera_matrix = np.array([[w, 0, w / 2], [0, w, h / 2], [0, 0, 1]], dtype=np.float64)
+    success, _, translation = cv2.solvePnP(MODEL_POINTS, image_points, camera_matrix, np.zeros((4, 1)),
+                                           flags=cv2.SOLVEPNP_ITERATIVE)
+    return bool(success and translation[2, 0] < 0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark the batched head pose estimator")
+    parser.add_argument('trace', nargs='?', help="Landmark trace (default: synthetic poses)")
+    parser.add_argument('--frames', type=int, default=100000, help="Synthetic frame count")
+    parser.add_argument('--check', type=int, default=2000, help="Frames compared against solvePnP")
+    parser.add_argument('--iterations', type=int, default=6, help="Gauss-Newton steps")
+    args = parser.parse_args()
+
+    if args.trace:
+        from face_detector import FaceDetector
+        from trace_cache import TraceReader
+        reader = TraceReader(args.trace)
+        face = np.flatnonzero(reader.has_face)
+        points = reader.image_points(FaceDetector.POSE_LANDMARKS)[face]
+        sizes = np.stack([reader.records['width'], reader.records['height']], axis=1)[face]
+    else:
+        points, sizes = _synthetic_points(args.frames)
+    print(f"{len(points)} frames")
+    if not len(points):
+        return 1
+
+    start = time.perf_counter()
+    batch = estimate_head_pose(points, sizes, args.iterations)
+    elapsed = time.perf_counter() - start
+    print(f"Batched: {len(points) / elapsed:,.0f} frames/s ({elapsed:.3f} s)")
+
+    # Mevcut solvePnP yolu ile karşılaştırma
+    from face_detector import FaceDetector
+    detector = FaceDetector(inference=False)
+    count = min(args.check, len(points))
+    reference = np.full((count, 3), np.nan)
+    start = time.perf_counter()
+    for i in range(count):
+        euler = detector._solve_head_pose(points[i], (int(sizes[i][1]), int(sizes[i][0])))
+        if euler is not None:
+            reference[i] = euler
+    elapsed = time.perf_counter() - start
+    print(f"solvePnP: {count / elapsed:,.0f} frames/s ({elapsed:.3f} s for {count} frames)")
+
+    closed_form = estimate_head_pose(points[:count], sizes[:count], iterations=0)
+    ok = np.isfinite(reference).all(axis=1)
+    error = _angle_error(batch[:count][ok], reference[ok])
+    # solvePnP bazen kameranın arkasındaki ayna çözüme yakınsar; bunlar ayrı sayılır
+    agree = error.max(axis=1) < 0.5
+    print(f"Agreement within 0.5 degrees: {agree.mean():.1%} of {ok.sum()} frames")
+    if agree.any():
+        for name, values in (('batched', batch[:count][ok]), ('weak-perspective only', closed_form[ok])):
+            diff = _angle_error(values[agree], reference[ok][agree])
+            print(f"{name} vs solvePnP (pitch, yaw, roll) degrees: "
+                  f"mean {np.round(diff.mean(axis=0), 5).tolist()}, max {np.round(diff.max(axis=0), 5).tolist()}")
+    if not agree.all():
+        behind = sum(_pnp_behind_camera(p, s) for p, s in zip(points[:count][ok][~agree], sizes[:count][ok][~agree]))
+        print(f"{(~agree).sum()} disagreeing frames, {behind} of them with the solvePnP pose behind the camera")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Named performance profiles and startup auto-selection.
+
+A profile bundles the FaceMesh options (refine_landmarks, confidences), the
+inference resolution, the capture size, the target frame rate, optical-flow
+tracking and whether landmarks are drawn. At first launch a short
+micro-benchmark times FaceDetector.detect_face for each profile, from the most
+to the least expensive, and picks the first one whose frame time fits the
+budget of its target frame rate. The choice is cached per machine so later
+launches start immediately; pass --profile NAME to override or
+--profile auto --rebenchmark to measure again.
+
+FaceMesh only runs its landmark model when a face is found, so timings on
+frames without a face (no camera, nobody in view) are far too optimistic. Such
+a measurement is never cached: FALLBACK_PROFILE is used for this launch and
+the benchmark runs again at the next one.
+"""
+
+import json
+import os
+import platform
+import time
+
+import cv2
+import numpy as np
+
+# Pahalıdan ucuza sıralı
+PROFILES = {
+    'quality': {
+        'refine_landmarks': True,
+        'min_detection_confidence': 0.7,
+        'min_tracking_confidence': 0.7,
+        'inference_width': None,
+        'capture_size': (640, 360),
+        'target_fps': 30,
+        'track_interval': 1,
+        'draw': True,
+    },
+    'balanced': {
+        'refine_landmarks': False,
+        'min_detection_confidence': 0.6,
+        'min_tracking_confidence': 0.6,
+        'inference_width': 480,
+        'capture_size': (640, 360),
+        'target_fps': 30,
+        'track_interval': 2,
+        'draw': True,
+    },
+    'low-power': {
+        'refine_landmarks': False,
+        'min_detection_confidence': 0.5,
+        'min_tracking_confidence': 0.5,
+        'inference_width': 320,
+        'capture_size': (320, 180),
+        'target_fps': 15,
+        'track_interval': 3,
+        'draw': False,
+    },
+}
+DEFAULT_PROFILE = 'quality'
+# Yüz görülmeden yapılan ölçümde kullanılır (önbelleğe yazılmaz)
+FALLBACK_PROFILE = 'balanced'
+DETECTOR_KEYS = ('refine_landmarks', 'min_detection_confidence', 'min_tracking_confidence',
+                 'inference_width', 'track_interval')
+
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.head_control', 'profile.json')
+# Kare süresinin bu kadarı algılamaya ayrılır; gerisi yakalama ve arayüz için
+BUDGET_FRACTION = 0.75
+
+def create_face_detector(profile_name, **overrides):
+    """
+    Create a FaceDetector configured for a profile.
+
+    Args:
+        profile_name: Key of PROFILES
+        overrides: FaceDetector arguments that take precedence over the profile
+
+    Returns:
+        FaceDetector instance
+    """
+    from face_detector import FaceDetector
+    profile = PROFILES[profile_name]
+    kwargs = {key: profile[key] for key in DETECTOR_KEYS}
+    kwargs.update({key: value for key, value in overrides.items() if value is not None})
+    return FaceDetector(**kwargs)
+
+def _machine_id():
+    return f"{platform.node()}|{platform.machine()}|{platform.processor()}|{os.cpu_count()}"
+
+def _benchmark_frames(capture_size, count, camera_index=0):
+    """Grab frames from the camera, or synthesize them if it is unavailable."""
+    frames = []
+    cap = cv2.VideoCapture(camera_index)
+    if cap.isOpened():
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, capture_size[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, capture_size[1])
+        for _ in range(count):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.flip(frame, 1))
+        cap.release()
+    if not frames:
+        rng = np.random.default_rng(0)
+        w, h = capture_size
+        frames = [rng.integers(0, 256, (h, w, 3), dtype=np.uint8) for _ in range(count)]
+    return frames
+
+def benchmark_profile(profile_name, frames=30, warmup=5, camera_index=0):
+    """
+    Measure the mean detect_face time of a profile (tracking frames included).
+
+    Returns:
+        (mean frame time in milliseconds, number of measured frames with a face)
+    """
+    profile = PROFILES[profile_name]
+    detector = create_face_detector(profile_name)
+    images = _benchmark_frames(profile['capture_size'], frames + warmup, camera_index)
+    times = []
+    faces = 0
+    for i, image in enumerate(images):
+        start = time.perf_counter()
+        _, result = detector.detect_face(image, draw=profile['draw'], timestamp=i / profile['target_fps'])
+        if i >= warmup:
+            times.append((time.perf_counter() - start) * 1000.0)
+            if result['pose_points'] is not None:
+                faces += 1
+    if detector.face_mesh is not None:
+        detector.face_mesh.close()
+    return (float(np.mean(times)) if times else float('inf')), faces
+
+def _load_cache(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def cached_profile(cache_path=CACHE_PATH):
+    """Profile chosen earlier on this machine, or None."""
+    cached = _load_cache(cache_path)
+    if cached and cached.get('machine') == _machine_id() and cached.get('profile') in PROFILES:
+        return cached['profile']
+    return None
+
+def select_profile(cache_path=CACHE_PATH, rebenchmark=False, camera_index=0):
+    """
+    Pick the best profile that keeps the frame time under budget on this machine.
+
+    Args:
+        cache_path: JSON file remembering the choice per machine
+        rebenchmark: Ignore the cached choice and measure again
+        camera_index: Camera used for benchmark frames
+
+    Returns:
+        Profile name
+    """
+    cached = None if rebenchmark else cached_profile(cache_path)
+    if cached:
+        return cached
+
+    timings = {}
+    chosen = None
+    for name, profile in PROFILES.items():
+        budget = BUDGET_FRACTION * 1000.0 / profile['target_fps']
+        timings[name], faces = benchmark_profile(name, camera_index=camera_index)
+        print(f"Profile {name}: {timings[name]:.1f} ms/frame (budget {budget:.1f} ms)")
+        if not faces:
+            # Landmark modeli hiç çalışmadı; ölçüm anlamsız
+            print(f"No face in view during the benchmark; using '{FALLBACK_PROFILE}' "
+                  f"and measuring again at the next launch.")
+            return FALLBACK_PROFILE
+        if timings[name] <= budget:
+            chosen = name
+            break
+    if chosen is None:
+        chosen = list(PROFILES)[-1]
+
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'machine': _machine_id(), 'profile': chosen, 'timings_ms': timings,
+                       'measured_at': time.time()}, f, indent=2)
+    except OSError as e:
+        print(f"Could not cache profile choice: {str(e)}")
+    return chosen
+
+def resolve_profile(name, rebenchmark=False, camera_index=0, benchmark=True):
+    """
+    Map 'auto' (or None) to the benchmarked profile, validate explicit names.
+
+    With benchmark=False, 'auto' uses the cached choice or FALLBACK_PROFILE
+    instead of measuring.
+    """
+    if name in (None, 'auto'):
+        if not benchmark:
+            return cached_profile() or FALLBACK_PROFILE
+        return select_profile(rebenchmark=rebenchmark, camera_index=camera_index)
+    if name not in PROFILES:
+        raise ValueError(f"Unknown profile: {name} (choose from {', '.join(PROFILES)})")
+    return name
@@ -0,0 +1,44 @@
+"""
+Head movement shortcut mapping shared by the GUI and the headless daemon.
+"""
+
+# Ayarlar penceresinde gösterilen komutlar
+COMMANDS = ['Sonraki Şarkı', 'Önceki Şarkı', 'Oynat/Duraklat', 'Sessize Al', 'Hiçbiri']
+
+MOVEMENT_KEYS = ['right', 'left', 'up', 'down']
+
+DEFAULT_SHORTCUT_MAP = {
+    'right': 'Sonraki Şarkı',
+    'left': 'Önceki Şarkı',
+    'up': 'Oynat/Duraklat',
+    'down': 'Oynat/Duraklat',
+}
+
+VK_VOLUME_MUTE = 0xAD
+
+def run_shortcut(music_controller, movement, shortcut_map):
+    """
+    Execute the command mapped to a detected head movement.
+
+    Args:
+        music_controller: MusicController instance (or any object with the same methods)
+        movement: Detected movement ('right', 'left', 'up', 'down') or None
+        shortcut_map: Dictionary mapping movements to command names
+
+    Returns:
+        str: The executed command name, or None if nothing was executed
+    """
+    if not movement or music_controller is None:
+        return None
+    cmd = shortcut_map.get(movement, None)
+    if cmd == 'Sonraki Şarkı':
+        music_controller.next_track()
+    elif cmd == 'Önceki Şarkı':
+        music_controller.previous_track()
+    elif cmd == 'Oynat/Duraklat':
+        music_controller.toggle_play_pause()
+    elif cmd == 'Sessize Al':
+        music_controller.send_media_key(VK_VOLUME_MUTE)
+    else:
+        return None
+    return cmd
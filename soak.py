@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Long-running soak test for memory and handle leaks.
+
+Drives HeadControlApp offscreen (Qt "offscreen" platform) with synthetic or
+recorded frames and a fake media backend, for as long as asked. Detection runs
+in the InferenceWorker thread with results delivered through queued signals,
+as in the real app; --sync tests the synchronous fallback instead.
+At every sample it records the process RSS, the number of live Python objects
+(gc) and, with tracemalloc enabled, the allocation sites that grew the most
+since the baseline. The baseline is taken after a warm-up period so caches,
+model loading and Qt's first paint are not counted as leaks.
+
+The run fails (exit code 1) when RSS or the object count grows past the given
+thresholds.
+
+Usage:
+    python soak.py --hours 4 [--video clip.mp4] [--profile balanced]
+    python soak.py --minutes 10 --max-rss-growth 30 --csv soak.csv
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import cv2
+import numpy as np
+
+from profiles import PROFILES, create_face_detector
+from utils import get_memory_usage_mb
+
+class FakeMusicController:
+    """Media backend stand-in that only counts the commands it receives."""
+    volume_step = 0.02
+
+    def __init__(self):
+        self.calls = {}
+        self.volume = 0.5
+        self.is_playing = False
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        return True
+
+    def send_media_key(self, key_code):
+        return self._count(f"key_{key_code:#x}")
+
+    def next_track(self):
+        return self._count('next_track')
+
+    def previous_track(self):
+        return self._count('previous_track')
+
+    def toggle_play_pause(self):
+        self.is_playing = not self.is_playing
+        return self._count('toggle_play_pause')
+
+    def send_volume_steps(self, steps):
+        self.volume = max(0.0, min(1.0, self.volume + steps * self.volume_step))
+        self._count('volume_steps')
+        return steps
+
+    def set_volume(self, volume):
+        self.volume = max(0.0, min(1.0, volume))
+        return self._count('set_volume')
+
+    def get_logs(self):
+        return []
+
+    def cleanup(self):
+        pass
+
+class LoopingCapture:
+    """cv2.VideoCapture look-alike that loops a video file or synthesizes frames."""
+    def __init__(self, video=None, size=(640, 360)):
+        self.video = video
+        self.size = size
+        self.cap = cv2.VideoCapture(video) if video else None
+        self.index = 0
+        self._base = None
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.cap is not None:
+            ret, frame = self.cap.read()
+            if not ret:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = self.cap.read()
+            return ret, frame
+        if self._base is None:
+            w, h = self.size
+            x = np.linspace(0, 255, w, dtype=np.float32)
+            y = np.linspace(0, 255, h, dtype=np.float32)[:, None]
+            self._base = np.dstack([(x + y) / 2, np.broadcast_to(x, (h, w)), np.broadcast_to(y, (h, w))]).astype(np.uint8)
+        self.index += 1
+        # Her karede değişen içerik: kayan desen + hareketli kutu
+        frame = np.roll(self._base, self.index % self.size[0], axis=1)
+        cx = int((np.sin(self.index / 30.0) + 1) * 0.4 * self.size[0])
+        cv2.rectangle(frame, (cx, 60), (cx + 80, 140), (255, 255, 255), -1)
+        return True, frame
+
+    def set(self, prop, value):
+        return True
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+def take_sample(start):
+    gc.collect()
+    rss, _ = get_memory_usage_mb()
+    return {
+        'elapsed': time.perf_counter() - start,
+        'rss_mb': rss,
+        'objects': len(gc.get_objects()),
+        'traced_mb': tracemalloc.get_traced_memory()[0] / 2**20 if tracemalloc.is_tracing() else None,
+    }
+
+def print_top_growth(baseline_snapshot, limit=5):
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    for stat in snapshot.compare_to(baseline_snapshot, 'lineno')[:limit]:
+        print(f"    {stat}")
+
+def run_soak(duration, video=None, profile_name='balanced', warmup=60.0, sample_interval=60.0,
+             max_rss_growth=50.0, max_object_growth=20000, use_tracemalloc=True, csv_path=None,
+             threaded=True):
+    """
+    Run the soak test.
+
+    Args:
+        duration: Seconds to run after warm-up
+        video: Video file to loop (None for synthetic frames)
+        profile_name: Performance profile for the detector and capture size
+        warmup: Seconds before the baseline sample
+        sample_interval: Seconds between samples
+        max_rss_growth: Allowed RSS growth over the baseline in MB
+        max_object_growth: Allowed growth of live Python objects
+        use_tracemalloc: Track Python allocation sites
+        csv_path: Optional CSV file for the samples
+        threaded: Run detection in the InferenceWorker thread like the app
+
+    Returns:
+        bool: True if growth stayed within the thresholds
+    """
+    from PyQt5.QtWidgets import QApplication
+    from gui import HeadControlApp
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    profile = PROFILES[profile_name]
+    window = HeadControlApp()
+    window.set_profile(profile)
+    window.set_controllers(create_face_detector(profile_name), FakeMusicController())
+    window.cap = LoopingCapture(video, profile['capture_size'])
+    if threaded:
+        window.start_inference_worker()
+    window.show()
+
+    if use_tracemalloc:
+        tracemalloc.start(10)
+    csv_file = open(csv_path, 'w', encoding='utf-8') if csv_path else None
+    if csv_file:
+        csv_file.write("elapsed_s,frames,rss_mb,objects,traced_mb\n")
+
+    start = time.perf_counter()
+    frames = 0
+    baseline = None
+    baseline_snapshot = None
+    next_sample = start + warmup
+    end = start + warmup + duration
+    ok = True
+    try:
+        while True:
+            window.step_frame()
+            frames += 1
+            now = time.perf_counter()
+            if now < next_sample and now < end:
+                continue
+            sample = take_sample(start)
+            if csv_file:
+                csv_file.write(f"{sample['elapsed']:.1f},{frames},{sample['rss_mb']},{sample['objects']},{sample['traced_mb']}\n")
+                csv_file.flush()
+            if baseline is None:
+                baseline = sample
+                if use_tracemalloc:
+                    baseline_snapshot = tracemalloc.take_snapshot()
+                print(f"Baseline after {sample['elapsed']:.0f}s: RSS {sample['rss_mb']:.1f} MB, {sample['objects']} objects")
+            else:
+                rss_growth = sample['rss_mb'] - baseline['rss_mb'] if sample['rss_mb'] is not None else 0.0
+                object_growth = sample['objects'] - baseline['objects']
+                fps = frames / sample['elapsed']
+                print(f"[{sample['elapsed'] / 60:.1f} min] {frames} frames ({fps:.1f} fps), "
+                      f"{window.detection_count} detections, "
+                      f"RSS +{rss_growth:.1f} MB, objects +{object_growth}")
+                if baseline_snapshot is not None:
+                    print_top_growth(baseline_snapshot)
+                if rss_growth > max_rss_growth:
+                    print(f"FAIL: RSS grew {rss_growth:.1f} MB (limit {max_rss_growth} MB)")
+                    ok = False
+                if object_growth > max_object_growth:
+                    print(f"FAIL: live objects grew by {object_growth} (limit {max_object_growth})")
+                    ok = False
+                if not ok:
+                    break
+            if now >= end:
+                break
+            next_sample = now + sample_interval
+    finally:
+        if csv_file:
+            csv_file.close()
+        if use_tracemalloc:
+            tracemalloc.stop()
+        window.close()
+
+    calls = window.music_controller.calls if window.music_controller else {}
+    print(f"Media commands issued: {calls}")
+    print("PASS" if ok else "FAILED")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test HeadControlApp for memory and handle leaks")
+    parser.add_argument('--hours', type=float, default=0.0)
+    parser.add_argument('--minutes', type=float, default=0.0)
+    parser.add_argument('--video', help="Video file to loop instead of synthetic frames")
+    parser.add_argument('--profile', default='balanced', choices=list(PROFILES))
+    parser.add_argument('--warmup', type=float, default=60.0, help="Seconds before the baseline sample")
+    parser.add_argument('--interval', type=float, default=60.0, help="Seconds between samples")
+    parser.add_argument('--max-rss-growth', type=float, default=50.0, help="Allowed RSS growth in MB")
+    parser.add_argument('--max-object-growth', type=int, default=20000, help="Allowed growth of live Python objects")
+    parser.add_argument('--no-tracemalloc', action='store_true', help="Disable allocation tracking (lower overhead)")
+    parser.add_argument('--csv', help="Write samples to this CSV file")
+    parser.add_argument('--sync', action='store_true',
+                        help="Run detection in the GUI thread instead of the inference worker")
+    args = parser.parse_args()
+
+    duration = args.hours * 3600 + args.minutes * 60 or 600.0
+    ok = run_soak(duration, args.video, args.profile, args.warmup, args.interval, args.max_rss_growth,
+                  args.max_object_growth, not args.no_tracemalloc, args.csv, threaded=not args.sync)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Vectorized threshold / hysteresis / debounce sweep over recorded pose traces.
+
+Replays the decision logic of FaceDetector._analyze_head_movement and the
+debounce in FaceDetector.detect_face for thousands of parameter combinations at
+once. Every combination is a row of a (K, T) array and all per-frame logic is
+expressed with NumPy broadcasting and cumulative operations, so there is no
+Python loop over frames.
+
+Swept parameters:
+- yaw / pitch trigger thresholds (degrees)
+- hysteresis (degrees): once active, a movement is released only after the
+  angle falls below threshold - hysteresis
+- min_interval (seconds): repeat interval while a movement is held
+- dwell (seconds): how long a movement must be held before the first trigger
+
+Trace files are .npz archives with 'timestamp' (T,) and 'euler' (T, 3) arrays
+(NaN rows where no face was found) and the labeled events either stored as a
+JSON string under 'events' or in a sidecar JSON file with the same stem (same
+format as evaluate.py). evaluate.py --traces DIR writes such files. Landmark
+traces recorded by the app (.hmlt, see trace_cache.py) are read directly.
+
+Timestamps are assumed to be roughly uniform; durations are converted to frame
+counts with the median frame period of each trace.
+
+Usage:
+    python sweep.py traces/*.npz --yaw 10:30:1 --pitch 8:25:1 --hysteresis 0:8:2 \\
+        --interval 1:4:0.5 --dwell 0:0.5:0.1 [--csv all.csv]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from event_bus import MOVEMENT_CODES
+
+RIGHT, LEFT, UP, DOWN = (MOVEMENT_CODES[m] for m in ('right', 'left', 'up', 'down'))
+
+def load_trace(path):
+    """
+    Load a recorded pose trace.
+
+    Returns:
+        Tuple of (timestamps (T,), euler (T, 3), events list)
+    """
+    if Path(path).suffix == '.hmlt':
+        from trace_cache import TraceReader
+        reader = TraceReader(path)
+        timestamps, euler, events = reader.timestamps, reader.euler, None
+    else:
+        with np.load(path, allow_pickle=False) as data:
+            timestamps = np.asarray(data['timestamp'], dtype=np.float64)
+            euler = np.asarray(data['euler'], dtype=np.float32)
+            events = json.loads(str(data['events'])) if 'events' in data.files else None
+    if events is None:
+        with open(Path(path).with_suffix('.json'), encoding='utf-8') as f:
+            events = json.load(f).get('events', [])
+    return timestamps, euler, events
+
+def parameter_grid(yaw, pitch, hysteresis, interval, dwell):
+    """
+    Build the flat cartesian product of all parameter values.
+
+    Returns:
+        Dictionary of (K,) arrays keyed by parameter name
+    """
+    grids = np.meshgrid(yaw, pitch, hysteresis, interval, dwell, indexing='ij')
+    names = ('yaw', 'pitch', 'hysteresis', 'interval', 'dwell')
+    return {name: g.ravel() for name, g in zip(names, grids)}
+
+def _hysteresis_state(signal, on, off):
+    """
+    Latched on/off state for every parameter row.
+
+    Args:
+        signal: (T,) angle series, NaN forces the state off
+        on: (K, 1) thresholds to switch on (signal > on)
+        off: (K, 1) thresholds to switch off (signal <= off)
+
+    Returns:
+        (K, T) boolean array
+    """
+    invalid = np.isnan(signal)[None, :]
+    on_evt = signal[None, :] > on
+    off_evt = invalid | (~on_evt & (signal[None, :] <= off))
+    T = signal.shape[0]
+    idx = np.where(on_evt | off_evt, np.arange(T)[None, :], -1)
+    last = np.maximum.accumulate(idx, axis=1)
+    state = np.take_along_axis(on_evt, np.maximum(last, 0), axis=1)
+    return state & (last >= 0)
+
+def classify(euler, params):
+    """
+    Per-frame movement codes for every parameter row.
+
+    Args:
+        euler: (T, 3) pitch, yaw, roll in degrees
+        params: Dictionary of (K,) parameter arrays
+
+    Returns:
+        (K, T) int8 array of movement codes (0 = none)
+    """
+    pitch, yaw = euler[:, 0], euler[:, 1]
+    yaw_on = params['yaw'][:, None]
+    pitch_on = params['pitch'][:, None]
+    h = params['hysteresis'][:, None]
+    right = _hysteresis_state(yaw, yaw_on, yaw_on - h)
+    left = _hysteresis_state(-yaw, yaw_on, yaw_on - h)
+    down = _hysteresis_state(pitch, pitch_on, pitch_on - h)
+    up = _hysteresis_state(-pitch, pitch_on, pitch_on - h)
+    # _analyze_head_movement ile aynı öncelik: önce yaw, sonra pitch
+    return np.select([right, left, down, up], [RIGHT, LEFT, DOWN, UP], 0).astype(np.int8)
+
+def triggers(movement, params, frame_period):
+    """
+    Apply dwell and repeat-interval debouncing.
+
+    Args:
+        movement: (K, T) movement codes from classify()
+        params: Dictionary of (K,) parameter arrays
+        frame_period: Seconds per frame
+
+    Returns:
+        (K, T) boolean array, True where a command would be sent
+    """
+    K, T = movement.shape
+    prev = np.concatenate([np.zeros((K, 1), dtype=movement.dtype), movement[:, :-1]], axis=1)
+    frames = np.arange(T)[None, :]
+    run_start = np.maximum.accumulate(np.where(movement != prev, frames, 0), axis=1)
+    held = frames - run_start
+    first = np.ceil(params['dwell'] / frame_period - 1e-9).astype(np.int64)[:, None]
+    # detect_face tekrar için (now - last) > min_interval koşulunu kullanır
+    repeat = (np.floor(params['interval'] / frame_period).astype(np.int64) + 1)[:, None]
+    since_first = held - first
+    return (movement > 0) & (since_first >= 0) & (since_first % repeat == 0)
+
+def _event_frames(timestamps, events, tolerance):
+    """Convert labeled events to sorted, non-overlapping [start, stop) frame ranges."""
+    ranges = []
+    for event in sorted(events, key=lambda e: e['start']):
+        a = int(np.searchsorted(timestamps, event['start'], side='left'))
+        b = int(np.searchsorted(timestamps, event['end'] + tolerance, side='right'))
+        if ranges:
+            a = max(a, ranges[-1][1])
+        if b > a:
+            ranges.append((a, b, MOVEMENT_CODES.get(event['movement'], 0)))
+    return ranges
+
+def score_trace(timestamps, euler, events, params, tolerance=0.5):
+    """
+    Score every parameter row on one trace.
+
+    Returns:
+        Dictionary of (K,) arrays: triggers, hits, false_triggers, latency_sum,
+        plus scalars events and duration
+    """
+    frame_period = float(np.median(np.diff(timestamps))) if len(timestamps) > 1 else 1 / 30
+    movement = classify(euler, params)
+    trig = triggers(movement, params, frame_period)
+    K, T = trig.shape
+
+    ranges = _event_frames(timestamps, events, tolerance)
+    label = np.zeros(T, dtype=np.int8)
+    for a, b, code in ranges:
+        label[a:b] = code
+    correct = trig & (movement == label[None, :]) & (label[None, :] > 0)
+
+    hits = np.zeros(K, dtype=np.int64)
+    latency_sum = np.zeros(K, dtype=np.float64)
+    if ranges:
+        bounds = np.array([x for a, b, _ in ranges for x in (a, b)])
+        first_idx = np.where(correct, np.arange(T)[None, :], T)
+        first_idx = np.concatenate([first_idx, np.full((K, 1), T)], axis=1)
+        first = np.minimum.reduceat(first_idx, bounds, axis=1)[:, ::2]
+        detected = first < T
+        starts = np.array([timestamps[a] for a, _, _ in ranges])
+        ts = np.append(timestamps, np.nan)
+        latency = np.where(detected, ts[np.minimum(first, T)] - starts[None, :], 0.0)
+        hits = detected.sum(axis=1)
+        latency_sum = latency.sum(axis=1)
+
+    total = trig.sum(axis=1)
+    return {
+        'triggers': total,
+        'hits': hits,
+        'false_triggers': total - hits,
+        'latency_sum': latency_sum,
+        'events': len(ranges),
+        'duration': float(timestamps[-1] - timestamps[0]) + frame_period if T else 0.0,
+    }
+
+def run_sweep(trace_paths, params, tolerance=0.5, chunk_size=2048):
+    """
+    Score all parameter rows over all traces, chunking rows to bound memory.
+
+    Returns:
+        Dictionary of (K,) metric arrays: false_per_min, latency, recall
+    """
+    K = len(params['yaw'])
+    hits = np.zeros(K)
+    false_triggers = np.zeros(K)
+    latency_sum = np.zeros(K)
+    events = 0
+    duration = 0.0
+    for path in trace_paths:
+        timestamps, euler, labels = load_trace(path)
+        for start in range(0, K, chunk_size):
+            rows = slice(start, start + chunk_size)
+            chunk = {name: values[rows] for name, values in params.items()}
+            result = score_trace(timestamps, euler, labels, chunk, tolerance)
+            hits[rows] += result['hits']
+            false_triggers[rows] += result['false_triggers']
+            latency_sum[rows] += result['latency_sum']
+        events += result['events']
+        duration += result['duration']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'false_per_min': false_triggers / (duration / 60.0) if duration else np.full(K, np.nan),
+            'latency': np.where(hits > 0, latency_sum / np.maximum(hits, 1), np.nan),
+            'recall': hits / events if events else np.full(K, np.nan),
+        }
+
+def pareto_front(false_rate, latency, mask=None):
+    """
+    Indices of parameter rows not dominated in (false rate, latency).
+
+    Returns:
+        Index array sorted by increasing false rate
+    """
+    candidates = np.flatnonzero(~np.isnan(latency) if mask is None else mask & ~np.isnan(latency))
+    order = candidates[np.lexsort((latency[candidates], false_rate[candidates]))]
+    best = np.minimum.accumulate(latency[order])
+    keep = np.concatenate([[True], best[1:] < best[:-1]]) if len(order) else np.zeros(0, dtype=bool)
+    return order[keep]
+
+def _parse_range(text):
+    """Parse 'start:stop:step' (inclusive stop) or a comma separated list."""
+    if ':' in text:
+        start, stop, step = (float(v) for v in text.split(':'))
+        return np.arange(start, stop + step / 2, step)
+    return np.array([float(v) for v in text.split(',')])
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep detection thresholds over recorded pose traces")
+    parser.add_argument('traces', nargs='+', help="Trace .npz files")
+    parser.add_argument('--yaw', default='10:30:1', help="Yaw thresholds (default: 10:30:1)")
+    parser.add_argument('--pitch', default='8:25:1', help="Pitch thresholds (default: 8:25:1)")
+    parser.add_argument('--hysteresis', default='0:8:2', help="Hysteresis widths (default: 0:8:2)")
+    parser.add_argument('--interval', default='1:4:0.5', help="Repeat intervals in seconds (default: 1:4:0.5)")
+    parser.add_argument('--dwell', default='0', help="Dwell times in seconds (default: 0)")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Seconds a trigger may lag behind a labeled event")
+    parser.add_argument('--min-recall', type=float, default=0.9, help="Only consider rows reaching this recall")
+    parser.add_argument('--csv', help="Write all rows and metrics to this CSV file")
+    args = parser.parse_args()
+
+    params = parameter_grid(_parse_range(args.yaw), _parse_range(args.pitch), _parse_range(args.hysteresis),
+                            _parse_range(args.interval), _parse_range(args.dwell))
+    print(f"Evaluating {len(params['yaw'])} combinations over {len(args.traces)} traces")
+    metrics = run_sweep(args.traces, params, args.tolerance)
+
+    if args.csv:
+        columns = dict(params, **metrics)
+        header = ','.join(columns)
+        np.savetxt(args.csv, np.column_stack(list(columns.values())), delimiter=',', header=header,
+                   comments='', fmt='%.6g')
+
+    front = pareto_front(metrics['false_per_min'], metrics['latency'], metrics['recall'] >= args.min_recall)
+    if not len(front):
+        print(f"No combination reaches recall {args.min_recall}")
+        return 1
+    print(f"{'yaw':>6}{'pitch':>7}{'hyst':>6}{'interval':>10}{'dwell':>7}{'false/min':>11}{'latency':>9}{'recall':>8}")
+    for i in front:
+        print(f"{params['yaw'][i]:>6.1f}{params['pitch'][i]:>7.1f}{params['hysteresis'][i]:>6.1f}"
+              f"{params['interval'][i]:>10.2f}{params['dwell'][i]:>7.2f}{metrics['false_per_min'][i]:>11.3f}"
+              f"{metrics['latency'][i]:>9.3f}{metrics['recall'][i]:>8.3f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
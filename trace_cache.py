@@ -0,0 +1,260 @@
+"""
+Append-only, memory-mapped landmark trace cache.
+
+A trace file stores one fixed-size record per processed frame: the timestamp,
+the image size, the FaceMesh landmark array (N x 3 float32, normalized like
+MediaPipe's output), the head pose and a flag telling whether a face was found.
+Because every record has the same size, frame i lives at a fixed offset and the
+whole file can be opened as a NumPy memmap of a structured dtype: the
+'landmarks', 'euler' and 'timestamp' columns are zero-copy views.
+
+File layout:
+    header (64 bytes): magic, version, landmark count, record size
+    records:           RECORD_DTYPE(N) * frame count
+
+The sidecar index file (<trace>.idx) lists the recording segments, one
+(start_frame, start_time) pair per recording session, so replays can reset
+their debounce state when a new session starts. The frame count itself is
+derived from the file size, so a trace stays readable after a crash.
+
+Usage:
+    python trace_cache.py recordings/landmarks.hmlt [--recompute-pose] [--pnp]
+replays the trace through FaceDetector's pose/movement logic without inference.
+Recomputed poses come from the batched estimator in pose_batch.py; --pnp uses
+the per-frame solvePnP path instead.
+Trace files can also be passed to sweep.py directly (labels in a sidecar JSON).
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from pose_batch import estimate_head_pose
+
+MAGIC = b'HMLT'
+VERSION = 1
+HEADER_FORMAT = '<4sHHI'
+HEADER_SIZE = 64
+INDEX_DTYPE = np.dtype([('start_frame', '<i8'), ('start_time', '<f8')])
+FLAG_FACE = 0x01
+FLAG_POSE = 0x02
+
+DEFAULT_TRACE_PATH = os.path.join('recordings', 'landmarks.hmlt')
+
+def record_dtype(num_landmarks):
+    """Structured dtype of one frame record for the given landmark count."""
+    return np.dtype([
+        ('timestamp', '<f8'),
+        ('width', '<u2'),
+        ('height', '<u2'),
+        ('flags', '<u4'),
+        ('euler', '<f4', (3,)),
+        ('landmarks', '<f4', (num_landmarks, 3)),
+    ])
+
+def _read_header(f):
+    magic, version, num_landmarks, record_size = struct.unpack(HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a landmark trace file")
+    if record_dtype(num_landmarks).itemsize != record_size:
+        raise ValueError("Corrupt landmark trace header")
+    return num_landmarks
+
+class TraceWriter:
+    """Appends frame records to a trace file."""
+    def __init__(self, path=DEFAULT_TRACE_PATH, num_landmarks=478):
+        """
+        Open (or create) a trace file for appending and start a new segment.
+
+        Args:
+            path: Trace file path
+            num_landmarks: Landmarks per frame (478 with refine_landmarks, else 468)
+
+        Raises:
+            ValueError: If an existing trace file has a different landmark count
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            with open(path, 'rb') as f:
+                existing = _read_header(f)
+            # Farklı profille (468/478 landmark) kaydedilmiş dosyaya eklenemez
+            if existing != num_landmarks:
+                raise ValueError(f"{path} holds {existing} landmarks per frame, the detector produces "
+                                 f"{num_landmarks}; choose another trace file")
+        else:
+            with open(path, 'wb') as f:
+                header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, num_landmarks, record_dtype(num_landmarks).itemsize)
+                f.write(header.ljust(HEADER_SIZE, b'\0'))
+        self.num_landmarks = num_landmarks
+        self.dtype = record_dtype(num_landmarks)
+        self._file = open(path, 'ab')
+        # Yarım kalmış son kayıt varsa kayıt sınırına hizala
+        size = self._file.seek(0, os.SEEK_END)
+        whole = (size - HEADER_SIZE) // self.dtype.itemsize
+        if HEADER_SIZE + whole * self.dtype.itemsize != size:
+            self._file.truncate(HEADER_SIZE + whole * self.dtype.itemsize)
+        self.frames = whole
+        self._record = np.zeros(1, dtype=self.dtype)
+        segment = np.array([(self.frames, time.time())], dtype=INDEX_DTYPE)
+        with open(path + '.idx', 'ab') as f:
+            f.write(segment.tobytes())
+
+    def append(self, timestamp, landmarks, euler, image_shape):
+        """
+        Append one frame.
+
+        Args:
+            timestamp: Frame time in seconds
+            landmarks: (N, 3) float32 normalized landmarks, or None if no face
+            euler: Pose angles (pitch, yaw, roll) or None
+            image_shape: Shape of the analyzed frame
+        """
+        rec = self._record[0]
+        rec['timestamp'] = timestamp
+        rec['height'], rec['width'] = image_shape[:2]
+        flags = 0
+        if landmarks is not None:
+            if len(landmarks) != self.num_landmarks:
+                raise ValueError(f"Expected {self.num_landmarks} landmarks, got {len(landmarks)}")
+            rec['landmarks'] = landmarks
+            flags |= FLAG_FACE
+        else:
+            rec['landmarks'] = 0
+        if euler is not None:
+            rec['euler'] = euler
+            flags |= FLAG_POSE
+        else:
+            rec['euler'] = np.nan
+        rec['flags'] = flags
+        self._file.write(self._record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+class TraceReader:
+    """Zero-copy, memory-mapped view of a trace file."""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.num_landmarks = _read_header(f)
+        self.path = path
+        self.dtype = record_dtype(self.num_landmarks)
+        count = (os.path.getsize(path) - HEADER_SIZE) // self.dtype.itemsize
+        if count > 0:
+            self.records = np.memmap(path, dtype=self.dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+        index_path = path + '.idx'
+        if os.path.exists(index_path):
+            self.segments = np.fromfile(index_path, dtype=INDEX_DTYPE)
+        else:
+            self.segments = np.array([(0, 0.0)], dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def timestamps(self):
+        return self.records['timestamp']
+
+    @property
+    def landmarks(self):
+        return self.records['landmarks']
+
+    @property
+    def euler(self):
+        return self.records['euler']
+
+    @property
+    def has_face(self):
+        return (self.records['flags'] & FLAG_FACE) != 0
+
+    def image_points(self, indices):
+        """
+        Pixel coordinates of selected landmarks for all frames.
+
+        Args:
+            indices: Landmark indices, e.g. FaceDetector.POSE_LANDMARKS
+
+        Returns:
+            (T, len(indices), 2) float64 array
+        """
+        size = np.stack([self.records['width'], self.records['height']], axis=1).astype(np.float64)
+        # solvePnP bitişik (C-contiguous) dizi bekler
+        return np.ascontiguousarray(self.landmarks[:, indices, :2] * size[:, None, :])
+
+    def segment_starts(self):
+        return self.segments['start_frame']
+
+def replay(reader, detector, recompute_pose=False, batch_pose=True):
+    """
+    Replay a trace through the detector's pose and movement logic.
+
+    Args:
+        reader: TraceReader
+        detector: FaceDetector (its FaceMesh is never called)
+        recompute_pose: Solve the pose again from the stored landmarks instead
+            of using the recorded angles
+        batch_pose: Recompute all poses at once with pose_batch instead of
+            calling solvePnP per frame
+
+    Yields:
+        Detection result dictionaries like FaceDetector.detect_face()
+    """
+    starts = set(int(s) for s in reader.segment_starts())
+    timestamps = reader.timestamps
+    has_face = reader.has_face
+    has_pose = (reader.records['flags'] & FLAG_POSE) != 0
+    points = reader.image_points(detector.POSE_LANDMARKS) if recompute_pose else None
+    euler = reader.euler
+    if recompute_pose and batch_pose:
+        sizes = np.stack([reader.records['width'], reader.records['height']], axis=1)
+        points[~has_face] = np.nan
+        recomputed = estimate_head_pose(points, sizes)
+        # Optik akışla takip edilen karelerde kayıtlı poz korunur (--pnp yolu gibi)
+        euler = np.where(has_face[:, None], recomputed, euler)
+        has_pose = np.where(has_face, np.isfinite(recomputed).all(axis=1), has_pose)
+        recompute_pose = False
+    for i in range(len(reader)):
+        if i in starts:
+            detector.reset()
+        if recompute_pose and has_face[i]:
+            rec = reader.records[i]
+            e = detector._solve_head_pose(points[i], (int(rec['height']), int(rec['width'])))
+        else:
+            # Optik akışla takip edilen karelerde sadece poz kaydedilir
+            e = euler[i] if has_pose[i] else None
+        movement = detector._analyze_head_movement(e)
+        yield {'movement': detector._debounce(movement, float(timestamps[i])), 'euler': e,
+               'timestamp': float(timestamps[i])}
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a landmark trace without inference")
+    parser.add_argument('trace', nargs='?', default=DEFAULT_TRACE_PATH)
+    parser.add_argument('--recompute-pose', action='store_true', help="Run the pose solver on the stored landmarks")
+    parser.add_argument('--pnp', action='store_true', help="Recompute poses per frame with solvePnP")
+    args = parser.parse_args()
+
+    from face_detector import FaceDetector
+    reader = TraceReader(args.trace)
+    detector = FaceDetector(inference=False)
+    start = time.perf_counter()
+    triggered = 0
+    for result in replay(reader, detector, args.recompute_pose, batch_pose=not args.pnp):
+        if result['movement']:
+            triggered += 1
+            print(f"{result['timestamp']:.3f} {result['movement']}")
+    elapsed = time.perf_counter() - start
+    rate = len(reader) / elapsed if elapsed > 0 else float('inf')
+    print(f"{len(reader)} frames, {len(reader.segments)} segments, {triggered} triggers, {rate:.0f} frames/s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 import os
+import sys
 import cv2
 import numpy as np
-import torch
 from PIL import Image, ImageDraw, ImageFont
 import time
 
@@ -12,6 +12,8 @@ def get_device():
     Returns:
         torch.device: The device to use for PyTorch operations
     """
+    # torch is imported lazily so that the headless daemon does not pay for it
+    import torch
     return torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
 def overlay_text(frame, text, position, font_scale=0.7, color=(0, 255, 0), thickness=2):
@@ -162,4 +164,49 @@ def rect_to_bb(rect):
     w = rect.right() - x
     h = rect.bottom() - y
     
-    return (x, y, w, h) 
\ No newline at end of file
+    return (x, y, w, h) 
+
+def get_memory_usage_mb():
+    """
+    Get the current and peak resident memory of this process.
+
+    Returns:
+        Tuple of (rss_mb, peak_rss_mb); values are None if unavailable
+    """
+    if os.name == 'nt':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD),
+                        ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t),
+                        ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t),
+                        ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None, None
+        return counters.WorkingSetSize / 2**20, counters.PeakWorkingSetSize / 2**20
+
+    rss = peak = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss = int(line.split()[1]) / 1024
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) / 1024
+    except OSError:
+        import resource
+        # macOS reports bytes, Linux reports kilobytes
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = maxrss / 2**20 if sys.platform == 'darwin' else maxrss / 1024
+    return rss, peak
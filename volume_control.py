@@ -0,0 +1,174 @@
+"""
+Analog volume control from head roll.
+
+Roll (euler[2]) beyond a dead zone is turned into volume key steps:
+- 'rate' mode: the tilt angle sets a volume change rate (steps per second),
+  so holding the head tilted keeps turning the volume up or down.
+- 'target' mode: the tilt angle moves a volume target away from the level the
+  volume had when the tilt started: tilting further towards max_roll moves it
+  proportionally towards 100% (or 0%), so a small tilt only changes the volume
+  a little. The controller steps towards the target from its volume estimate.
+
+Roll readings further than max_roll + outlier_margin from the neutral
+position are physically implausible (solvePnP occasionally returns the
+mirrored pose behind the camera, with roll near ±180) and are treated like
+frames without a face.
+
+update() runs in the frame loop and only does arithmetic: steps are
+accumulated into a signed pending counter (opposite steps cancel out). A
+sender thread wakes every burst_interval seconds and sends at most max_burst
+pending steps with one MusicController.send_volume_steps() call, so the OS
+input queue sees a bounded rate of coalesced bursts and the frame loop never
+waits for key presses.
+"""
+
+import threading
+import time
+
+class RollVolumeControl:
+    """Maps head roll to rate-limited, coalesced volume key bursts."""
+    def __init__(self, music_controller, mode='rate', dead_zone=10.0, gain=0.8, max_rate=20.0,
+                 max_roll=35.0, burst_interval=0.1, max_burst=3, invert=False, roll_offset=0.0,
+                 outlier_margin=25.0):
+        """
+        Initialize the roll volume control.
+
+        Args:
+            music_controller: Object with send_volume_steps(), volume and volume_step
+            mode: 'rate' or 'target'
+            dead_zone: Roll in degrees that is ignored around the neutral position
+            gain: Steps per second per degree beyond the dead zone (rate mode)
+            max_rate: Upper bound of the step rate in steps per second (rate mode)
+            max_roll: Roll in degrees that moves the target all the way to 0% / 100% (target mode)
+            burst_interval: Seconds between two bursts sent to the OS
+            max_burst: Maximum steps per burst
+            invert: Swap the tilt direction
+            roll_offset: Neutral roll angle of the user in degrees
+            outlier_margin: Degrees beyond max_roll after which a reading is ignored
+        """
+        if mode not in ('rate', 'target'):
+            raise ValueError(f"Unknown roll volume mode: {mode}")
+        self.music_controller = music_controller
+        self.mode = mode
+        self.dead_zone = dead_zone
+        self.gain = gain
+        self.max_rate = max_rate
+        self.max_roll = max_roll
+        self.burst_interval = burst_interval
+        self.max_burst = max_burst
+        self.invert = invert
+        self.roll_offset = roll_offset
+        self.outlier_margin = outlier_margin
+        # Gecikmeyi sınırlamak için en fazla birkaç patlamalık adım biriktirilir
+        self.max_pending = 3 * max_burst
+        self._pending = 0
+        self._in_flight = 0
+        self._fraction = 0.0
+        self._anchor = None
+        self._last_time = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="roll-volume", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def calibrate(self, euler):
+        """Use the current roll as the neutral position."""
+        if euler is not None:
+            self.roll_offset = float(euler[2])
+
+    def update(self, euler, timestamp=None):
+        """
+        Feed the latest pose. Called from the frame loop; never blocks on I/O.
+
+        Args:
+            euler: Pose angles (pitch, yaw, roll) or None if no face
+            timestamp: Frame time in seconds (defaults to now)
+        """
+        now = time.time() if timestamp is None else timestamp
+        last, self._last_time = self._last_time, now
+        roll = None if euler is None else (float(euler[2]) - self.roll_offset + 180.0) % 360.0 - 180.0
+        if roll is None or abs(roll) > self.max_roll + self.outlier_margin:
+            # Yüz yok ya da imkansız poz (kameranın arkasındaki ayna çözüm);
+            # hedef modun başlangıç seviyesi korunur, aksi halde hedef kayardı
+            self._fraction = 0.0
+            return
+        if self.invert:
+            roll = -roll
+        excess = abs(roll) - self.dead_zone
+        if excess <= 0:
+            self._fraction = 0.0
+            self._anchor = None
+            if self.mode == 'target':
+                with self._lock:
+                    self._pending = 0
+            return
+        sign = 1 if roll > 0 else -1
+
+        if self.mode == 'rate':
+            if last is None:
+                return
+            # Uzun kare boşluklarından sonra sıçramayı önle
+            dt = min(max(now - last, 0.0), 0.2)
+            self._fraction += sign * min(self.max_rate, self.gain * excess) * dt
+            whole = int(self._fraction)
+            if whole:
+                self._fraction -= whole
+                self._add_pending(whole)
+        else:
+            span = max(self.max_roll - self.dead_zone, 1e-6)
+            amount = min(excess / span, 1.0)
+            with self._lock:
+                step = self.music_controller.volume_step
+                estimate = self.music_controller.volume + (self._pending + self._in_flight) * step
+                if self._anchor is None:
+                    # Eğimin başladığı andaki ses seviyesinden itibaren ölçeklenir
+                    self._anchor = min(1.0, max(0.0, estimate))
+                headroom = 1.0 - self._anchor if sign > 0 else self._anchor
+                target = self._anchor + sign * amount * headroom
+                self._pending = max(-self.max_pending, min(self.max_pending,
+                                    self._pending + int(round((target - estimate) / step))))
+        if self._pending:
+            self._wake.set()
+
+    def _add_pending(self, steps):
+        with self._lock:
+            self._pending = max(-self.max_pending, min(self.max_pending, self._pending + steps))
+
+    def _run(self):
+        next_burst = time.perf_counter()
+        while self._running:
+            self._wake.wait()
+            self._wake.clear()
+            if not self._running:
+                break
+            # Patlamalar arasında en az burst_interval beklenir
+            delay = next_burst - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with self._lock:
+                steps = max(-self.max_burst, min(self.max_burst, self._pending))
+                self._pending -= steps
+                self._in_flight = steps
+            if steps:
+                try:
+                    self.music_controller.send_volume_steps(steps)
+                except Exception as e:
+                    print(f"Error sending volume steps: {str(e)}")
+            with self._lock:
+                self._in_flight = 0
+                remaining = self._pending
+            next_burst = time.perf_counter() + self.burst_interval
+            if remaining:
+                self._wake.set()